@@ -1,15 +1,17 @@
 """Analyze data scraped from the.protocol job portal"""
 import os
 import dotenv
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 from config import POSITION
+from analyzing.skill_aliases import skill_aliases
+from analyzing.skills_cube import SKILLS_KINDS, VACANCIES_KIND
+from analyzing.diagrams_renderer import bars_image, pie_image
 from analyzing.utility import (
-    removing_duplicates,
-    get_result_diagram,
-    from_column_to_data_frame,
-    wedges_formatter
+    column_values_codes,
+    column_values_counts,
+    column_values_masks
 )
 
 dotenv.load_dotenv()
@@ -19,43 +21,84 @@ scraped_data = os.path.join("..", os.getenv("SCRAPING_RESULT_DIR"))
 # TODO: I can use Celery and Redis for processing intensive tasks
 
 
-def count_required_skills(df: pd.DataFrame) -> dict:
-    """Count the occurrence of each skill in 'required_skills' column"""
+def vacancies_rows(cube: pd.DataFrame) -> pd.DataFrame:
+    """Rows of skills cube counting all vacancies"""
+    return cube[cube["kind"] == VACANCIES_KIND]
 
-    # Make all required skills into one Series
-    required_skills = pd.Series(df["required_skills"].explode().to_list())
-    # required_skills = pd.Series(df.required_skills.sum())
-    # optional_skills = pd.Series(df.optional_skills.dropna().sum())
 
-    # Count the occurrences of each skill
-    required_skills_counts = required_skills.value_counts()
-    # optional_skills_counts = optional_skills.value_counts()
+def skills_rows(cube: pd.DataFrame, kind: str) -> np.ndarray:
+    """Mask of skills cube rows counting skills of 'kind'"""
+    return ((cube["kind"] == kind) & cube["skill"].notna()).to_numpy()
 
-    # Remove duplicates, because we have scraped data not only
+
+def canonical_codes(skills: pd.Index) -> tuple[np.ndarray, pd.Index]:
+    """Code of canonical skill of each of skills and canonical skills"""
+    aliases = skill_aliases()
+    return pd.factorize(
+        skills.map(lambda skill: aliases.get(skill, skill)), sort=True
+    )
+
+
+def count_skills(cube: pd.DataFrame, kind: str) -> dict:
+    """
+    Count the occurrence of each skill of 'kind' in skills cube, counts
+    of skills are added to counts of their canonical skills
+    """
+    skills = cube[skills_rows(cube, kind)]
+    _, codes, names = column_values_codes(skills, "skill")
+
+    # Merge duplicates, because we have scraped data not only
     # from set up labels on website but
     # also we have processed text requirements
-    required_skills_dict = removing_duplicates(required_skills_counts)
-    # optional_skills_dict = removing_duplicates(optional_skills_counts)
+    skill_codes, canonical_skills = canonical_codes(names)
+    skills_counts = np.bincount(
+        skill_codes[codes],
+        weights=skills["count"].to_numpy(),
+        minlength=len(canonical_skills)
+    ).astype(np.int64)
 
-    return required_skills_dict
+    return dict(zip(canonical_skills, skills_counts.tolist()))
 
 
-def count_optional_skills(df: pd.DataFrame) -> dict:
-    """Count the occurrence of each skill in 'required_skills' column"""
+def count_required_skills(cube: pd.DataFrame) -> dict:
+    """Count the occurrence of each required skill"""
+    return count_skills(cube, "required_skills")
 
-    # Make all optional skills into one Series
-    optional_skills = pd.Series(df["optional_skills"].explode().to_list())
 
-    # Count the occurrences of each skill
-    optional_skills_counts = optional_skills.value_counts()
+def count_optional_skills(cube: pd.DataFrame) -> dict:
+    """Count the occurrence of each optional skill"""
+    return count_skills(cube, "optional_skills")
 
-    # Remove duplicates, because we have scraped data not only
-    # from set up labels on website but also
-    # we have processed text requirements
-    # and update counts for optional and required skills
-    optional_skills_dict = removing_duplicates(optional_skills_counts)
 
-    return optional_skills_dict
+def count_skills_by_level(cube: pd.DataFrame, level_masks: dict) -> dict:
+    """
+    Count the occurrence of each skill of each kind for all levels of
+    experience from 'level_masks' of skills cube rows, returns
+    {(level, kind): {skill: count}}
+    """
+    skills_counts = {}
+
+    for kind in SKILLS_KINDS:
+        kind_rows = skills_rows(cube, kind)
+        skills = cube[kind_rows]
+        _, codes, names = column_values_codes(skills, "skill")
+        skill_codes, canonical_skills = canonical_codes(names)
+        codes = skill_codes[codes]
+        weights = skills["count"].to_numpy()
+
+        for level, mask in level_masks.items():
+            level_rows = mask[kind_rows]
+            counts = np.bincount(
+                codes[level_rows],
+                weights=weights[level_rows],
+                minlength=len(canonical_skills)
+            ).astype(np.int64)
+            found = np.flatnonzero(counts)
+            skills_counts[(level, kind)] = dict(
+                zip(canonical_skills[found], counts[found].tolist())
+            )
+
+    return skills_counts
 
 
 def skills_from_dict_to_dataframe(
@@ -76,211 +119,213 @@ def skills_from_dict_to_dataframe(
     return skills_df
 
 
-def get_optional_skills(df: pd.DataFrame) -> pd.DataFrame:
-    return skills_from_dict_to_dataframe(count_optional_skills(df=df))
+def get_optional_skills(cube: pd.DataFrame) -> pd.DataFrame:
+    return skills_from_dict_to_dataframe(count_optional_skills(cube=cube))
 
 
-def get_required_skills(df: pd.DataFrame) -> pd.DataFrame:
-    return skills_from_dict_to_dataframe(count_required_skills(df=df))
+def get_required_skills(cube: pd.DataFrame) -> pd.DataFrame:
+    return skills_from_dict_to_dataframe(count_required_skills(cube=cube))
 
 
-def set_y_labels(data) -> None:
+def chart(chart_type: str, title: str, labels, values) -> dict:
     """
-    Dynamically changes the range of numbers on axis 'y'/
-    :param data:
-    :return:
+    Data of one chart, which is drawn to PNG or sent as JSON to be
+    drawn in browser
     """
-    max_count = data.max()
-    # dynamically calculate the step which are going
-    # to represent x labels
-    step = (max_count // 10 + 1) * 10 // 5
-    plt.yticks(range(0, max_count + step, step))
-
-
-def skills_by_level_of_exp(df: pd.DataFrame) -> str:
-    """Show required and optional skills base on level of experience"""
-
-    level_of_exp = from_column_to_data_frame(df, "level_of_exp")
-    df_exp = df.merge(level_of_exp, right_index=True, left_index=True)
-
-    fig, axes = plt.subplots(
-        len(level_of_exp.columns),
-        2,
-        figsize=(20, len(level_of_exp.columns) * 5)
-    )
-
-    for i, exp_level in enumerate(level_of_exp.columns):
-        # filter 'df_exp' base on level of experience
-        exp_level_df = df_exp[df_exp[exp_level] == 1]
-
-        required_skills, optional_skills = (
-            get_required_skills(exp_level_df),
-            get_optional_skills(exp_level_df)
-        )
-
-        required_top_skills = required_skills.iloc[:30]
-        optional_top_skills = optional_skills.iloc[:30]
+    return {
+        "type": chart_type,
+        "title": title,
+        "labels": [str(label) for label in labels],
+        "values": [int(value) for value in values],
+    }
 
-        # get required and optional diagram
-        re_axe = axes[i, 0]
-        op_axe = axes[i, 1]
 
-        # show top required skills base on exp_level
-        re_axe.bar(required_top_skills["skills"], required_top_skills["count"])
-
-        re_axe.set_title((
+def skills_by_level_of_exp_data(cube: pd.DataFrame) -> dict:
+    """
+    Top required and optional skills for each level of experience,
+    charts of required and optional skills of each level follow each
+    other
+    """
+    level_masks = column_values_masks(cube, "level_of_exp")
+    skills_counts = count_skills_by_level(cube, level_masks)
+    # number of job descriptions of each level, all and with optional skills
+    counts = cube["count"].to_numpy()
+    vacancies = (cube["kind"] == VACANCIES_KIND).to_numpy()
+    with_optional_skills = (
+        (cube["kind"] == "optional_skills") & cube["skill"].isna()
+    ).to_numpy()
+    level_counts = {
+        level: counts[mask & vacancies].sum()
+        for level, mask in level_masks.items()
+    }
+    optional_level_counts = {
+        level: counts[mask & with_optional_skills].sum()
+        for level, mask in level_masks.items()
+    }
+
+    charts = []
+    for exp_level in level_masks:
+        required_top_skills = skills_from_dict_to_dataframe(
+            skills_counts[(exp_level, "required_skills")]
+        ).iloc[:30]
+        optional_top_skills = skills_from_dict_to_dataframe(
+            skills_counts[(exp_level, "optional_skills")]
+        ).iloc[:30]
+
+        charts.append(chart(
+            "bar",
             f"TOP {len(required_top_skills)} Required Skills "
             f"for {POSITION} Developer. With level of experience: {exp_level}."
-            f"Base on {exp_level_df.shape[0]} job descriptions"
+            f"Base on {level_counts[exp_level]} job descriptions",
+            required_top_skills["skills"],
+            required_top_skills["count"]
         ))
-        re_axe.set_xticks(range(len(required_top_skills["skills"])))
-        re_axe.set_xticklabels(
-            required_top_skills["skills"], rotation=45, ha="right"
-        )
-
-        max_count = required_top_skills["count"].max()
-        # dynamically calculate the step which are going
-        # to represent y labels
-        step = (max_count // 10 + 1) * 10 // 5
-        re_axe.set_ylabel(range(0, max_count + step, step))
-        re_axe.set_ylabel("Counts")
-
-        re_axe.grid(True)
-
-        # show top optional skills base on exp_level
-        op_axe.bar(optional_top_skills["skills"], optional_top_skills["count"])
-
-        op_axe.set_title((
+        charts.append(chart(
+            "bar",
             f"TOP {len(optional_top_skills)} Optional Skills for "
             f"{POSITION} Developer. With level of experience: {exp_level}. "
-            f"Base on {len(exp_level_df['optional_skills'].dropna())} "
-            "job descriptions"
+            f"Base on {optional_level_counts[exp_level]} "
+            "job descriptions",
+            optional_top_skills["skills"],
+            optional_top_skills["count"]
         ))
-        op_axe.set_xticks(range(len(optional_top_skills["skills"])))
-        op_axe.set_xticklabels(
-            optional_top_skills["skills"], rotation=45, ha="right")
-        op_axe.grid(True)
 
-    diagram = get_result_diagram()
-    plt.close()
+    return {"charts": charts}
 
-    return diagram
 
+def skills_by_level_of_exp(
+        cube: pd.DataFrame, image_format: str = "png"
+) -> bytes:
+    """Show required and optional skills base on level of experience"""
 
-def top_required_skills(df: pd.DataFrame) -> str:
-    """Top 30 required skills"""
+    charts = skills_by_level_of_exp_data(cube)["charts"]
+    # required and optional skills of each level are in one row
+    return bars_image(
+        charts,
+        figsize=(20, len(charts) // 2 * 5),
+        columns=2,
+        y_label="Counts",
+        with_y_ticks=False,
+        image_format=image_format
+    )
 
-    required_skills = get_required_skills(df=df)
-    top_skills = required_skills.iloc[:30, :]
 
-    plt.figure(figsize=(15, 5))
-    plt.bar(top_skills.skills, top_skills["count"])
+def top_skills_data(skills: pd.DataFrame, kind: str) -> dict:
+    """Top 30 skills of kind 'Required' or 'Optional'"""
+    top_skills = skills.iloc[:30, :]
+    return {"charts": [chart(
+        "bar",
+        f"TOP {top_skills.shape[0]} {kind} Skills for {POSITION}"
+        f" Developer (base on {skills.shape[0]} job descriptions)",
+        top_skills["skills"],
+        top_skills["count"]
+    )]}
 
-    plt.title(
-        f"TOP {top_skills.shape[0]} Required Skills for {POSITION}"
-        f" Developer (base on {required_skills.shape[0]} job descriptions)")
-    plt.xticks(rotation=45, ha="right")
-    plt.ylabel("Counts")
-    set_y_labels(top_skills["count"])
-    plt.grid(True)
 
-    diagram = get_result_diagram()
-    plt.close()
+def top_required_skills_data(cube: pd.DataFrame) -> dict:
+    return top_skills_data(get_required_skills(cube=cube), "Required")
 
-    return diagram
 
+def top_optional_skills_data(cube: pd.DataFrame) -> dict:
+    return top_skills_data(get_optional_skills(cube=cube), "Optional")
 
-def top_optional_skills(df: pd.DataFrame) -> str:
-    """Top 30 optional skills"""
 
-    optional_skills = get_optional_skills(df=df)
-    top_skills = optional_skills.iloc[:30, :]
+def top_required_skills(
+        cube: pd.DataFrame, image_format: str = "png"
+) -> bytes:
+    """Top 30 required skills"""
+    return bars_image(
+        top_required_skills_data(cube)["charts"],
+        figsize=(15, 5),
+        y_label="Counts",
+        image_format=image_format
+    )
 
-    plt.figure(figsize=(15, 5))
-    plt.bar(top_skills.skills, top_skills["count"])
 
-    plt.title(
-        f"TOP {top_skills.shape[0]} Optional Skills for {POSITION}"
-        f" Developer (base on {optional_skills.shape[0]} job descriptions)")
+def top_optional_skills(
+        cube: pd.DataFrame, image_format: str = "png"
+) -> bytes:
+    """Top 30 optional skills"""
+    return bars_image(
+        top_optional_skills_data(cube)["charts"],
+        figsize=(15, 5),
+        y_label="Counts",
+        image_format=image_format
+    )
 
-    plt.xticks(rotation=45, ha="right")
-    plt.ylabel("Counts")
-    set_y_labels(top_skills["count"])
-    plt.grid(True)
 
-    diagram = get_result_diagram()
-    plt.close()
+def compare_column_values_data(cube: pd.DataFrame, column: str) -> dict:
+    vacancies = vacancies_rows(cube)
+    column_sum = column_values_counts(
+        df=vacancies, column=column, weights=vacancies["count"]
+    ).sort_values(ascending=False)
 
-    return diagram
+    return {"charts": [chart(
+        "bar",
+        f"Comparing values in '{column}' column",
+        column_sum.index,
+        column_sum
+    )]}
 
 
-def bar_compare_column_values(df: pd.DataFrame, column: str) -> str:
+def bar_compare_column_values(
+        cube: pd.DataFrame, column: str, image_format: str = "png"
+) -> bytes:
     """ Using bar plot show comparison of column values """
+    return bars_image(
+        compare_column_values_data(cube, column)["charts"],
+        figsize=(10, 5),
+        image_format=image_format
+    )
 
-    #  make column to data frame
-    column_sum = from_column_to_data_frame(
-        df=df, column=column
-    ).sum().sort_values(ascending=False)
-
-    plt.figure(figsize=(10, 5))
-    plt.bar(column_sum.index, column_sum)
-    plt.title(f"Comparing values in '{column}' column")
-
-    set_y_labels(column_sum)
-    plt.xticks(rotation=45, ha="right")
-    plt.grid(True)
 
-    diagram = get_result_diagram()
-    plt.close()
+def ua_support_values_data(cube: pd.DataFrame) -> dict:
+    vacancies = vacancies_rows(cube)
+    ua_support = vacancies.groupby("ua_support")["count"].sum().sort_values(
+        ascending=False
+    )
 
-    return diagram
+    return {"charts": [chart(
+        "pie",
+        "How many job vacancies are open for ukrainians."
+        f" Base on {vacancies['count'].sum()} job descriptions",
+        ("No UA Support", "UA Support"),
+        ua_support
+    )]}
 
 
-def compare_ua_support_values(df: pd.DataFrame) -> str:
+def compare_ua_support_values(
+        cube: pd.DataFrame, image_format: str = "png"
+) -> bytes:
     """Show comparisons between values in column 'contracts'"""
+    (ua_support,) = ua_support_values_data(cube)["charts"]
+    return pie_image(ua_support, image_format=image_format)
 
-    ua_support = df["ua_support"].value_counts().sort_values(ascending=False)
 
-    plt.pie(
-        ua_support,
-        autopct=lambda v: wedges_formatter(v, ua_support),
-        labels=("No UA Support", "UA Support"),
-        textprops={"verticalalignment": "center"},
-    )
-    plt.title(
-        "How many job vacancies are open for ukrainians."
-        f" Base on {df.shape[0]} job descriptions"
-    )
-
-    diagram = get_result_diagram()
-    plt.close()
+def top_locations_data(cube: pd.DataFrame) -> dict:
+    vacancies = vacancies_rows(cube)
+    locations_values = vacancies.groupby("location", observed=True)[
+        "count"
+    ].sum().sort_values(ascending=False)
+    top_locations = locations_values.iloc[:10]
 
-    return diagram
+    return {"charts": [chart(
+        "pie",
+        f"Location of job vacancies."
+        f" Base on {vacancies['count'].sum()} job vacancies",
+        top_locations.index,
+        top_locations
+    )]}
 
 
-def get_top_locations(df: pd.DataFrame) -> str:
+def get_top_locations(
+        cube: pd.DataFrame, image_format: str = "png"
+) -> bytes:
     """Get top 20 locations to work in Poland"""
-
-    locations_values = df["location"].value_counts().sort_values(
-        ascending=False
-    )
-    top_locations = locations_values.iloc[:10]
-
-    fig, ax = plt.subplots(figsize=(15, 15))
-
-    ax.pie(
+    (top_locations,) = top_locations_data(cube)["charts"]
+    return pie_image(
         top_locations,
-        autopct=lambda v: wedges_formatter(v, top_locations),
-        labels=top_locations.index,
-        textprops={"verticalalignment": "center"},
+        figsize=(15, 15),
+        image_format=image_format,
         pctdistance=0.9
     )
-    ax.set_title(
-        f"Location of job vacancies."
-        f" Base on {df.shape[0]} job vacancies"
-    )
-
-    diagram = get_result_diagram()
-    plt.close()
-
-    return diagram
@@ -0,0 +1,184 @@
+"""
+Rendering of diagrams charts with matplotlib object-oriented API instead
+of pyplot. Figure of each diagram type is made once per thread and kept
+warm, so rendering only updates heights of its bars, pie wedges, labels
+and titles. Figures are never shared between threads, which makes
+rendering thread-safe, pyplot is not.
+"""
+import io
+import os
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from analyzing.utility import wedges_formatter
+
+# it is part of names of cached diagrams files, so its default is
+# the same in 'web_server.diagrams_cache.RENDER_SETTINGS'
+DPI = int(os.getenv("DIAGRAMS_DPI", 100))
+# image format: options of Pillow writer of the format, PNG is compressed
+# fast since it is only 1% bigger, WebP is lossless and 3 times smaller
+IMAGE_FORMATS = {
+    "png": {"compress_level": 1},
+    "webp": {"lossless": True},
+}
+
+# subplots positions figures are laid out from
+SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+templates = threading.local()
+
+
+def y_ticks(values: list[int]) -> range:
+    """Dynamically changes the range of numbers on axis 'y'"""
+    max_count = max(values, default=0)
+    step = (max_count // 10 + 1) * 10 // 5
+    return range(0, max_count + step, step)
+
+
+class BarAxes:
+    """Bar chart axes, bars are added only when chart has more of them"""
+
+    def __init__(self, axes: Axes, y_label: Optional[str] = None) -> None:
+        self.axes = axes
+        self.bars = []
+        if y_label:
+            axes.set_ylabel(y_label)
+        axes.grid(True)
+
+    def update(self, chart: dict, with_y_ticks: bool) -> None:
+        values = chart["values"]
+        if len(values) > len(self.bars):
+            self.bars.extend(self.axes.bar(
+                range(len(self.bars), len(values)), 0, color="C0"
+            ))
+
+        for position, bar in enumerate(self.bars):
+            bar.set_visible(position < len(values))
+            if position < len(values):
+                bar.set_height(values[position])
+
+        self.axes.set_xticks(
+            range(len(values)), chart["labels"], rotation=45, ha="right"
+        )
+        self.axes.set_title(chart["title"])
+        self.axes.relim(visible_only=True)
+        self.axes.autoscale_view()
+        # ticks extend limits of axis 'y', so they are set after limits
+        # are fitted to the chart
+        if with_y_ticks:
+            self.axes.set_yticks(y_ticks(values))
+
+
+class Template:
+    """Warm figure, which is drawn to image of diagram"""
+
+    def __init__(self, figsize: Optional[tuple]) -> None:
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+
+    def image(self, image_format: str) -> bytes:
+        # layout starts from default positions every time, so image
+        # does not depend on charts rendered before
+        self.figure.subplots_adjust(**{
+            name: rcParams[f"figure.subplot.{name}"]
+            for name in SUBPLOT_PARAMS
+        })
+        self.figure.tight_layout()
+
+        buf = io.BytesIO()
+        self.figure.savefig(
+            buf,
+            format=image_format,
+            dpi=DPI,
+            pil_kwargs=IMAGE_FORMATS[image_format]
+        )
+        return buf.getvalue()
+
+
+class BarsTemplate(Template):
+    """Figure of bar charts in grid of 'columns' columns"""
+
+    def __init__(
+            self,
+            figsize: tuple,
+            rows: int,
+            columns: int,
+            y_label: Optional[str]
+    ) -> None:
+        super().__init__(figsize)
+        grid = self.figure.subplots(rows, columns, squeeze=False)
+        # only charts of the first column have label of axis 'y'
+        self.axes = [
+            BarAxes(axes, y_label if column == 0 else None)
+            for row in grid
+            for column, axes in enumerate(row)
+        ]
+
+    def update(self, charts: list[dict], with_y_ticks: bool) -> None:
+        for bar_axes, chart in zip(self.axes, charts):
+            bar_axes.update(chart, with_y_ticks)
+
+
+class PieTemplate(Template):
+    """Figure of pie chart, pie is drawn again, as wedges differ"""
+
+    def __init__(self, figsize: Optional[tuple]) -> None:
+        super().__init__(figsize)
+        self.axes = self.figure.add_subplot()
+
+    def update(self, chart: dict, **pie_options) -> None:
+        values = np.array(chart["values"])
+        self.axes.clear()
+        self.axes.pie(
+            values,
+            autopct=lambda v: wedges_formatter(v, values),
+            labels=chart["labels"],
+            textprops={"verticalalignment": "center"},
+            **pie_options
+        )
+        self.axes.set_title(chart["title"])
+
+
+def warm_template(key: tuple, make_template: Callable) -> Template:
+    """Template of this thread, it is made when it is used first time"""
+    if not hasattr(templates, "figures"):
+        templates.figures = {}
+    if key not in templates.figures:
+        templates.figures[key] = make_template()
+    return templates.figures[key]
+
+
+def bars_image(
+        charts: list[dict],
+        figsize: tuple,
+        columns: int = 1,
+        y_label: Optional[str] = None,
+        with_y_ticks: bool = True,
+        image_format: str = "png"
+) -> bytes:
+    """Image of bar charts in grid of 'columns' columns"""
+    rows = len(charts) // columns
+    template = warm_template(
+        ("bars", figsize, rows, columns, y_label),
+        lambda: BarsTemplate(figsize, rows, columns, y_label)
+    )
+    template.update(charts, with_y_ticks)
+    return template.image(image_format)
+
+
+def pie_image(
+        chart: dict,
+        figsize: Optional[tuple] = None,
+        image_format: str = "png",
+        **pie_options
+) -> bytes:
+    """Image of pie chart, 'pie_options' are passed to 'Axes.pie'"""
+    template = warm_template(("pie", figsize), lambda: PieTemplate(figsize))
+    template.update(chart, **pie_options)
+    return template.image(image_format)
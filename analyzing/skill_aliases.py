@@ -0,0 +1,97 @@
+"""
+Persistent map of skills as they were scraped to canonical skills.
+The map is updated only with newly seen skills when scraping is
+finished, so skills are counted without fuzzy matching when diagrams
+are made.
+
+Map is filled from all saved scraping results with:
+    python -m analyzing.skill_aliases
+"""
+import os
+import logging
+from functools import lru_cache
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
+from sqlalchemy import func
+
+from analyzing.skills_canonicalization import canonical_names
+from db.connnect_db import session
+from db.models import ScrapingResultFileMetaData, SkillAlias
+
+logger = logging.getLogger(__name__)
+
+SKILLS_COLUMNS = ("required_skills", "optional_skills")
+# longer skills do not fit into DB and are counted as they are
+ALIAS_MAX_LENGTH = 300
+
+
+@lru_cache(maxsize=1)
+def read_skill_aliases(aliases_count: int) -> dict[str, str]:
+    return dict(session.query(SkillAlias.alias, SkillAlias.skill))
+
+
+def skill_aliases() -> dict[str, str]:
+    """
+    Canonical skill of each seen skill. Aliases are only added, so the
+    map is read from DB again only when number of aliases changes.
+    """
+    aliases_count = session.query(func.count(SkillAlias.alias)).scalar()
+    aliases = read_skill_aliases(aliases_count)
+    session.close()
+    return aliases
+
+
+def add_skill_aliases(skills: Iterable[str]) -> None:
+    """
+    Save canonical skills of skills which are not in the map yet,
+    they are merged with each other and with canonical skills in map
+    """
+    aliases = dict(session.query(SkillAlias.alias, SkillAlias.skill))
+    new_skills = {
+        skill for skill in skills
+        if skill not in aliases and len(skill) <= ALIAS_MAX_LENGTH
+    }
+
+    if new_skills:
+        canonical = canonical_names(new_skills | set(aliases.values()))
+        session.add_all(
+            SkillAlias(alias=skill, skill=canonical[skill])
+            for skill in new_skills
+        )
+        session.commit()
+        logger.info(f"Saved {len(new_skills)} new skill aliases")
+
+    session.close()
+
+
+def file_skills(file_path: str) -> set[str]:
+    """Distinct skills of scraping result file"""
+    table = feather.read_table(
+        file_path, columns=list(SKILLS_COLUMNS), memory_map=True
+    )
+    # older files have null column, when no vacancy had skills of it
+    return set().union(*(
+        pc.unique(pc.list_flatten(
+            table[column].cast(pa.list_(pa.string()))
+        )).drop_null().to_pylist()
+        for column in SKILLS_COLUMNS
+    ))
+
+
+def main() -> None:
+    skills = set()
+    for (file_path,) in session.query(ScrapingResultFileMetaData.file_path):
+        if os.path.isfile(file_path):
+            skills |= file_skills(file_path)
+        else:
+            logger.warning(f"Data file {file_path} does not exist")
+    session.close()
+
+    add_skill_aliases(skills)
+
+
+if __name__ == "__main__":
+    main()
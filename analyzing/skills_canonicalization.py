@@ -0,0 +1,165 @@
+"""
+Canonicalization of skills names: spelling variants and longer names of
+a skill ('AI', 'AI services') are merged into the shortest name.
+
+Skills are compared the same way as 'process.extractBests' with
+'fuzz.ratio' does it, but names are processed once, similarities are
+computed in batches by RapidFuzz, and each skill is compared only with
+skills of close length, because bigger difference in length gives
+lower ratio than 'SCORE_CUTOFF'.
+"""
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from rapidfuzz.distance import Indel
+from rapidfuzz.process import cdist
+
+# less similar skills are never merged
+SCORE_CUTOFF = 70
+# similar skill is merged if ratio is that high or if it starts
+# with the skill
+MERGE_SCORE = 85
+# number of the most similar skills checked for each skill
+LIMIT = 5
+# the biggest normalized Indel distance, which ratio is rounded
+# to 'SCORE_CUTOFF'
+MAX_DISTANCE = (100 - SCORE_CUTOFF + 0.5) / 100
+# number of skills compared in one batch
+BATCH_SIZE = 128
+# everything except letters and numbers, as fuzzywuzzy 'full_process'
+NOT_LETTERS_NUMBERS = r"(?ui)\W"
+
+
+def processed_names(names: pd.Index) -> list[str]:
+    """Lowercase letters and numbers of each name, others are spaces"""
+    return (
+        names.astype(str)
+        .str.replace(NOT_LETTERS_NUMBERS, " ", regex=True)
+        .str.lower()
+        .str.strip()
+        .tolist()
+    )
+
+
+def best_matches(names: list[str]) -> list[list[tuple[int, int]]]:
+    """
+    Positions and ratios of 'LIMIT' most similar names for each of
+    'names', ordered by ratio and equal ratios by position, like
+    'process.extractBests' returns them.
+    """
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    order = np.argsort(lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    matches = [[] for _ in names]
+
+    for start in range(0, len(names), BATCH_SIZE):
+        queries = order[start:start + BATCH_SIZE]
+
+        # only names which ratio can reach 'SCORE_CUTOFF' by length
+        low = np.searchsorted(
+            sorted_lengths,
+            lengths[queries[0]] * (1 - MAX_DISTANCE) / (1 + MAX_DISTANCE),
+            side="left"
+        )
+        high = np.searchsorted(
+            sorted_lengths,
+            lengths[queries[-1]] * (1 + MAX_DISTANCE) / (1 - MAX_DISTANCE),
+            side="right"
+        )
+        choices = np.sort(order[low:high])
+
+        # integer distances, as 'fuzz.ratio' is computed from them,
+        # above the largest distance possible in the batch are skipped
+        max_distance = int(
+            (lengths[queries[-1]] + sorted_lengths[high - 1]) * MAX_DISTANCE
+        )
+        distances = cdist(
+            [names[i] for i in queries],
+            [names[i] for i in choices],
+            scorer=Indel.distance,
+            score_cutoff=max_distance,
+            dtype=np.int16,
+            workers=-1
+        )
+        rows, columns = np.nonzero(distances <= max_distance)
+        queries_found, choices_found = queries[rows], choices[columns]
+
+        lengths_sum = np.maximum(
+            lengths[queries_found] + lengths[choices_found], 1
+        )
+        scores = np.rint(
+            100 * (1.0 - distances[rows, columns] / lengths_sum)
+        ).astype(int)
+
+        found = scores >= SCORE_CUTOFF
+        queries_found = queries_found[found]
+        choices_found = choices_found[found]
+        scores = scores[found]
+
+        # choices are in names order, so equal ratios stay in that order
+        for index in np.lexsort((columns[found], -scores, rows[found])):
+            query = queries_found[index]
+            if len(matches[query]) < LIMIT:
+                matches[query].append(
+                    (int(choices_found[index]), int(scores[index]))
+                )
+
+    return matches
+
+
+def skills_groups(names: list[str]) -> Iterator[tuple[int, set[int]]]:
+    """
+    Position of each canonical skill with positions of skills merged
+    into it, 'names' are sorted by length, so the shortest skill stays
+    """
+    lower_names = [name.lower() for name in names]
+    matches = best_matches(processed_names(pd.Index(names)))
+    duplicates = set()
+
+    for position in range(len(names)):
+        if position in duplicates:
+            continue
+
+        similar = {
+            match for match, score in matches[position]
+            if match != position and (
+                lower_names[match].startswith(lower_names[position])
+                or score >= MERGE_SCORE
+            )
+        }
+        yield position, similar
+        duplicates |= similar
+
+
+def canonical_skills(skills_counts: pd.Series) -> dict:
+    """
+    Merge counts of similar skills into count of the shortest of them,
+    'skills_counts' is Series of skills counts indexed by skills names
+    """
+    skills_counts = skills_counts.sort_index(key=lambda v: v.str.len())
+    names = skills_counts.index.tolist()
+    counts = skills_counts.tolist()
+
+    return {
+        names[position]: counts[position] + sum(
+            counts[match] for match in similar
+        )
+        for position, similar in skills_groups(names)
+    }
+
+
+def canonical_names(skills: Iterable[str]) -> dict[str, str]:
+    """
+    Canonical skill of each of 'skills', skill merged into several
+    skills belongs to the first of them
+    """
+    names = sorted(sorted(set(skills)), key=len)
+    canonical = {}
+
+    for position, similar in skills_groups(names):
+        canonical.setdefault(names[position], names[position])
+        for match in similar:
+            canonical.setdefault(names[match], names[position])
+
+    return canonical
@@ -0,0 +1,157 @@
+"""
+Skills cube, compact aggregate of scraping result file all diagrams are
+made of. Cube file is written next to scraping result file when scraping
+is finished, so diagrams of several files merge their cubes instead of
+reading all vacancies again.
+
+Cubes of saved scraping results without them are written with:
+    python -m analyzing.skills_cube
+"""
+import os
+import logging
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
+
+from db.connnect_db import session
+from db.models import ScrapingResultFileMetaData
+from scraping.schema import CUBE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+VACANCIES_KIND = "vacancies"
+SKILLS_KINDS = ("required_skills", "optional_skills")
+LIST_DIMENSIONS = ("level_of_exp", "employment_type", "contracts")
+DIMENSIONS = [field.name for field in CUBE_SCHEMA if field.name != "count"]
+# columns of scraping result file cube is made of
+VACANCIES_COLUMNS = [*SKILLS_KINDS, *LIST_DIMENSIONS, "location", "ua_support"]
+# lists are grouped as strings of their values joined with separator
+LIST_SEPARATOR = "\x1f"
+CUBE_FILE_PREFIX = "skills_cube_"
+COMPRESSION = "zstd"
+
+
+def cube_file_name(file_name: str) -> str:
+    """Name of cube file of scraping result file"""
+    return file_name.replace("vacancies_", CUBE_FILE_PREFIX, 1)
+
+
+def is_cube_file(file_path: str) -> bool:
+    return os.path.basename(file_path).startswith(CUBE_FILE_PREFIX)
+
+
+def list_keys(lists: pa.Array) -> pa.Array:
+    """Join values of each list to string, empty lists are null"""
+    keys = pc.binary_join(lists, LIST_SEPARATOR)
+    return pc.if_else(
+        pc.greater(pc.list_value_length(lists), 0),
+        keys,
+        pa.scalar(None, pa.string())
+    )
+
+
+def with_kind(
+        vacancies: pa.Table,
+        kind: str,
+        skills: Optional[pa.Array] = None
+) -> pa.Table:
+    return vacancies.append_column(
+        "kind", pa.array([kind] * vacancies.num_rows, pa.string())
+    ).append_column(
+        "skill",
+        pa.nulls(vacancies.num_rows, pa.string()) if skills is None
+        else skills
+    )
+
+
+def skills_cube(table: pa.Table) -> pa.Table:
+    """Aggregate table of vacancies to skills cube"""
+    table = table.select(VACANCIES_COLUMNS).cast(pa.schema([
+        (name, pa.list_(pa.string())) for name in SKILLS_KINDS
+    ] + [
+        (name, pa.list_(pa.string())) for name in LIST_DIMENSIONS
+    ] + [
+        ("location", pa.string()),
+        ("ua_support", pa.bool_()),
+    ]))
+
+    # columns are combined to single arrays, which are empty, not missing,
+    # when table has no rows
+    vacancies = pa.table({
+        **{
+            name: list_keys(table[name].combine_chunks())
+            for name in LIST_DIMENSIONS
+        },
+        "location": table["location"],
+        "ua_support": table["ua_support"],
+    })
+    parts = [with_kind(vacancies, VACANCIES_KIND)]
+
+    for kind in SKILLS_KINDS:
+        skills = table[kind].combine_chunks()
+        # vacancies listing skills of the kind and each of the skills
+        parts.append(with_kind(vacancies.filter(pc.is_valid(skills)), kind))
+        parts.append(with_kind(
+            vacancies.take(pc.list_parent_indices(skills)),
+            kind,
+            pc.list_flatten(skills)
+        ))
+
+    cube = pa.concat_tables(parts).group_by(
+        DIMENSIONS, use_threads=False
+    ).aggregate([([], "count_all")])
+
+    return pa.table({
+        name: (
+            pc.split_pattern(cube[name], LIST_SEPARATOR)
+            if name in LIST_DIMENSIONS else cube[name]
+        )
+        for name in DIMENSIONS
+    }).append_column("count", cube["count_all"]).cast(CUBE_SCHEMA)
+
+
+def read_skills_cube(file_path: str) -> pa.Table:
+    """Skills cube from cube file or made of scraping result file"""
+    if is_cube_file(file_path):
+        return feather.read_table(file_path, memory_map=True).cast(
+            CUBE_SCHEMA
+        )
+    return skills_cube(feather.read_table(
+        file_path, columns=VACANCIES_COLUMNS, memory_map=True
+    ))
+
+
+def write_skills_cube(file_path: str, cube_path: str) -> None:
+    """Write skills cube of scraping result file"""
+    feather.write_feather(
+        read_skills_cube(file_path), cube_path, compression=COMPRESSION
+    )
+
+
+def main() -> None:
+    for metadata in session.query(ScrapingResultFileMetaData).filter(
+            ScrapingResultFileMetaData.cube_file_name.is_(None)
+    ):
+        file_path = os.path.join(
+            os.getenv("SCRAPING_RESULT_DIR"), metadata.file_name
+        )
+        if not os.path.isfile(file_path):
+            logger.warning(f"Data file {file_path} does not exist")
+            continue
+
+        metadata.cube_file_name = cube_file_name(metadata.file_name)
+        write_skills_cube(
+            file_path,
+            os.path.join(
+                os.getenv("SCRAPING_RESULT_DIR"), metadata.cube_file_name
+            )
+        )
+        session.commit()
+
+    session.close()
+
+
+if __name__ == "__main__":
+    main()
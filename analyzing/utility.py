@@ -1,106 +1,117 @@
-import io
 import os
-import matplotlib
-import matplotlib.pyplot as plt
+import logging
 import pandas as pd
 import numpy as np
-from base64 import b64encode
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from pandas.api.extensions import ExtensionDtype
 
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
+from analyzing.skills_cube import read_skills_cube
 
-# Matplotlib backend to Agg which is a non-interactive backend
-# suitable for script and web application usage.
-matplotlib.use("Agg")
+logger = logging.getLogger(__name__)
 
+# Arrow releases GIL while decoding files, so files are read in threads
+READ_FILES_THREADS = min(8, os.cpu_count() or 1)
 
-def read_data_file(file_path: str) -> pd.DataFrame:
-    df = pd.read_feather(file_path)
-    return df
 
+def arrow_to_pandas_type(
+        arrow_type: pa.DataType
+) -> Optional[ExtensionDtype]:
+    """
+    Keep list columns Arrow-backed, so 'explode' and 'value_counts' are
+    done by Arrow, booleans with missing values as nullable 'boolean'.
+    Dictionary encoded columns are converted to 'category' by default.
+    """
+    if pa.types.is_list(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    return None
 
-def concatenated_df(file_paths: list[str]) -> pd.DataFrame:
-    """Concatenated multiple files of data into one DataFrame"""
-    if file_paths:
-        dfs = [
-            read_data_file(file_path)
-            for file_path in file_paths
-            if os.path.isfile(file_path)
-        ]
 
-        new_df = pd.concat(dfs, ignore_index=True)
+def read_tables(file_paths: list[str], read_table: Callable) -> list:
+    """
+    Read files concurrently with 'read_table', missing files are
+    skipped with warning
+    """
+    existing_paths = []
+    for file_path in file_paths:
+        if os.path.isfile(file_path):
+            existing_paths.append(file_path)
+        else:
+            logger.warning("Data file %s does not exist", file_path)
 
-        return new_df
+    if not existing_paths:
+        raise ValueError("There are no data files to concatenate")
 
+    with ThreadPoolExecutor(
+            max_workers=min(READ_FILES_THREADS, len(existing_paths))
+    ) as executor:
+        return list(executor.map(read_table, existing_paths))
 
-def from_column_to_data_frame(df: pd.DataFrame, column: str) -> pd.DataFrame:
-    """Making 'column' independent Data Frame"""
-    # Make each values in 'df' column.
-    # This approach is aligned with database normalization principles
-    # which aim to reduce redundancy and improve data integrity.
-    if column not in df.columns:
-        raise ValueError(f"There is not column: {column}")
 
-    explode_column = getattr(df, column).explode()
-    # remove that column from original Data Frame object
-    # df.drop(column, inplace=True, axis=1)
-    return pd.crosstab(explode_column.index, explode_column)
+def concatenated_cube(file_paths: list[str]) -> pd.DataFrame:
+    """
+    Skills cubes of multiple files in one DataFrame, files without cube
+    are aggregated to cube when read. Cubes are merged by concatenation,
+    since diagrams sum counts of cube rows.
+    """
+    tables = read_tables(file_paths, read_skills_cube)
+    return pa.concat_tables(tables).to_pandas(
+        types_mapper=arrow_to_pandas_type
+    )
 
 
-def get_result_diagram() -> str:
+def column_values_codes(
+        df: pd.DataFrame,
+        column: str
+) -> tuple[np.ndarray, np.ndarray, pd.Index]:
     """
-    Instead saving diagram to computer memory, we are going to save diagram in
-    io.BytesIO object, and to be able to view it on HTML page we are encoding
-    diagram BytesIO object to base64.b64encode and decoding to 'utf-8' text
-    format as standard for all web application.
-    :param diagram:
-    :return:
+    Row position and code of each value in lists of 'column', together
+    with sorted values the codes point to. Values are never spread into
+    a table of rows and values, so memory grows only with number of them.
     """
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
+    if column not in df.columns:
+        raise ValueError(f"There is not column: {column}")
+
+    explode_column = df[column].reset_index(drop=True).explode().dropna()
+    codes, values = pd.factorize(explode_column, sort=True)
 
-    return b64encode(buf.read()).decode("utf-8")
+    return explode_column.index.to_numpy(), codes, values.astype(str)
 
 
-def removing_duplicates(tool_counts) -> dict:
+def column_values_counts(
+        df: pd.DataFrame,
+        column: str,
+        weights: Optional[pd.Series] = None
+) -> pd.Series:
     """
-    Removing duplicates, exp 'AI', 'AI services' - is same,
-    'AI' should stay, and 'AI services' count value should be
-    added to 'AI' count
+    Number of occurrences of each value in lists of 'column', each row
+    is counted number of times in 'weights' (once if None)
     """
-    unq_words = {}
-    duplicates = set()
-
-    # Sort tool_counts by length of keys (tool names)
-    tool_counts_sorted = tool_counts.sort_index(key=lambda v: v.str.len())
-
-    for tool, count in tool_counts_sorted.items():
-        if tool not in duplicates:
-            matches = process.extractBests(
-                tool,
-                tool_counts_sorted.index,
-                scorer=lambda str1, str2: fuzz.ratio(
-                    str1.lower(), str2.lower()
-                ),
-                score_cutoff=70
-            )
-
-            # Filter out matches that are similar to the current tool
-            filtered_matches = {
-                match for match, score in matches if match != tool and (
-                    match.lower().startswith(tool.lower()) or score >= 85
-                    )
-            }
-
-            # Add count of similar tools to the current tool
-            unq_words[tool] = count + sum(
-                tool_counts[match] for match in filtered_matches
-            )
-            duplicates |= filtered_matches
-
-    return unq_words
+    rows, codes, values = column_values_codes(df, column)
+    counts = np.bincount(
+        codes,
+        weights=None if weights is None else weights.to_numpy()[rows],
+        minlength=len(values)
+    )
+    return pd.Series(counts.astype(np.int64), index=values)
+
+
+def column_values_masks(df: pd.DataFrame, column: str) -> dict:
+    """Boolean mask of rows, which lists of 'column' have value, by value"""
+    rows, codes, values = column_values_codes(df, column)
+    # rows of each value are next to each other
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+
+    masks = {}
+    for code, value in enumerate(values):
+        mask = np.zeros(len(df), dtype=bool)
+        mask[rows[order[bounds[code]:bounds[code + 1]]]] = True
+        masks[value] = mask
+    return masks
 
 
 def wedges_formatter(pct, allvals):
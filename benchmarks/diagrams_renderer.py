@@ -0,0 +1,196 @@
+"""
+Benchmark of warm diagrams renderer against the previous pyplot path,
+which made new figure, laid it out and saved it through pyplot for each
+diagram.
+
+Renders per second are measured for each diagram type on charts data
+which changes with each render. Images of both paths are compared by
+size and share of different pixels, and renderer is checked to make the
+same images when diagrams are rendered in threads.
+
+Run from the project root:
+    python -m benchmarks.diagrams_renderer
+"""
+import io
+import random
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import numpy as np
+from PIL import Image
+
+from analyzing.diagrams_renderer import bars_image, pie_image
+from analyzing.utility import wedges_formatter
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+RENDERS = 20
+THREADS = 4
+LEVELS = 5
+
+
+def previous_image() -> bytes:
+    buf = io.BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format="png")
+    plt.close()
+    return buf.getvalue()
+
+
+def set_y_labels(values: list) -> None:
+    max_count = max(values)
+    step = (max_count // 10 + 1) * 10 // 5
+    plt.yticks(range(0, max_count + step, step))
+
+
+def previous_bars(charts: list[dict], figsize: tuple) -> bytes:
+    (chart,) = charts
+    plt.figure(figsize=figsize)
+    plt.bar(chart["labels"], chart["values"])
+    plt.title(chart["title"])
+    plt.xticks(rotation=45, ha="right")
+    plt.ylabel("Counts")
+    set_y_labels(chart["values"])
+    plt.grid(True)
+    return previous_image()
+
+
+def previous_levels(charts: list[dict]) -> bytes:
+    rows = len(charts) // 2
+    fig, axes = plt.subplots(rows, 2, figsize=(20, rows * 5))
+    for position, chart in enumerate(charts):
+        axe = axes[position // 2, position % 2]
+        axe.bar(chart["labels"], chart["values"])
+        axe.set_title(chart["title"])
+        axe.set_xticks(range(len(chart["labels"])))
+        axe.set_xticklabels(chart["labels"], rotation=45, ha="right")
+        if position % 2 == 0:
+            axe.set_ylabel("Counts")
+        axe.grid(True)
+    return previous_image()
+
+
+def previous_pie(chart: dict, figsize: tuple = None, **pie_options) -> bytes:
+    values = np.array(chart["values"])
+    plt.figure(figsize=figsize)
+    plt.pie(
+        values,
+        autopct=lambda v: wedges_formatter(v, values),
+        labels=chart["labels"],
+        textprops={"verticalalignment": "center"},
+        **pie_options
+    )
+    plt.title(chart["title"])
+    return previous_image()
+
+
+def random_chart(
+        rnd: random.Random,
+        chart_type: str,
+        size: int,
+        max_value: int = 900
+) -> dict:
+    labels = {
+        "".join(rnd.choices(string.ascii_letters, k=rnd.randint(2, 14)))
+        for _ in range(size)
+    }
+    return {
+        "type": chart_type,
+        "title": f"TOP {len(labels)} skills of {rnd.randint(1, 5000)} jobs",
+        "labels": sorted(labels),
+        "values": sorted(
+            (rnd.randint(1, max_value) for _ in labels), reverse=True
+        ),
+    }
+
+
+# diagram: previous and renderer function of charts data, charts data
+CASES = {
+    "top skills": (
+        lambda charts: previous_bars(charts, (15, 5)),
+        lambda charts: bars_image(charts, (15, 5), y_label="Counts"),
+        lambda rnd: [random_chart(rnd, "bar", 30)],
+    ),
+    # warm figure goes from many big bars to few small ones and back
+    "changing top skills": (
+        lambda charts: previous_bars(charts, (15, 5)),
+        lambda charts: bars_image(charts, (15, 5), y_label="Counts"),
+        lambda rnd: [random_chart(
+            rnd, "bar", rnd.choice((3, 30)), rnd.choice((9, 900))
+        )],
+    ),
+    "column values": (
+        lambda charts: previous_bars(charts, (10, 5)),
+        lambda charts: bars_image(charts, (10, 5), y_label="Counts"),
+        lambda rnd: [random_chart(rnd, "bar", rnd.randint(3, 8))],
+    ),
+    "skills by level": (
+        previous_levels,
+        lambda charts: bars_image(
+            charts, (20, LEVELS * 5), columns=2, y_label="Counts",
+            with_y_ticks=False
+        ),
+        lambda rnd: [random_chart(rnd, "bar", 30) for _ in range(LEVELS * 2)],
+    ),
+    "ua support": (
+        lambda charts: previous_pie(charts[0]),
+        lambda charts: pie_image(charts[0]),
+        lambda rnd: [random_chart(rnd, "pie", 2)],
+    ),
+    "locations": (
+        lambda charts: previous_pie(charts[0], (15, 15), pctdistance=0.9),
+        lambda charts: pie_image(charts[0], (15, 15), pctdistance=0.9),
+        lambda rnd: [random_chart(rnd, "pie", 10)],
+    ),
+}
+
+
+def renders_per_second(render, charts_data: list) -> float:
+    render(charts_data[0])
+    start = time.perf_counter()
+    for charts in charts_data:
+        render(charts)
+    return len(charts_data) / (time.perf_counter() - start)
+
+
+def different_pixels(first: bytes, second: bytes) -> float:
+    """Share of different pixels, images of different size differ fully"""
+    first = np.asarray(Image.open(io.BytesIO(first)).convert("RGB"))
+    second = np.asarray(Image.open(io.BytesIO(second)).convert("RGB"))
+    if first.shape != second.shape:
+        return 1.0
+    return float(np.any(first != second, axis=2).mean())
+
+
+def rendered_in_threads(render, charts_data: list) -> bool:
+    """Whether images rendered in threads are the same as in one thread"""
+    images = [render(charts) for charts in charts_data]
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(render, charts_data)) == images
+
+
+def main() -> None:
+    for name, (previous, renderer, make_charts) in CASES.items():
+        rnd = random.Random(0)
+        charts_data = [make_charts(rnd) for _ in range(RENDERS)]
+
+        previous_speed = renders_per_second(previous, charts_data)
+        renderer_speed = renders_per_second(renderer, charts_data)
+        difference = max(
+            different_pixels(previous(charts), renderer(charts))
+            for charts in charts_data[:6]
+        )
+        print(
+            f"{name}: previous {previous_speed:.1f}/s, "
+            f"renderer {renderer_speed:.1f}/s "
+            f"({renderer_speed / previous_speed:.1f}x), "
+            f"different pixels {difference:.2%}, "
+            f"same in threads {rendered_in_threads(renderer, charts_data)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark of 'canonical_skills' against the previous 'removing_duplicates',
+which called 'process.extractBests' for each skill, on skills counts made
+of skills names, their spelling variants and longer names at 1k, 10k and
+50k distinct skills. The previous implementation is quadratic pure Python,
+so it is measured only up to 'PREVIOUS_MAX_SKILLS'. Parity of them is
+tested in 'tests/test_skills_canonicalization.py'.
+
+Run from the project root:
+    python -m benchmarks.skills_canonicalization
+"""
+import random
+import string
+import timeit
+
+import pandas as pd
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import process
+
+from analyzing.skills_canonicalization import canonical_skills
+
+SIZES = (1000, 10000, 50000)
+PREVIOUS_MAX_SKILLS = 1000
+SUFFIXES = (
+    "", "3", " 3", "JS", ".js", " API", " services", " Framework", "-ng",
+    " developer", "/CD", "ful", "s",
+)
+
+
+def previous_removing_duplicates(tool_counts: pd.Series) -> dict:
+    unq_words = {}
+    duplicates = set()
+
+    tool_counts_sorted = tool_counts.sort_index(key=lambda v: v.str.len())
+
+    for tool, count in tool_counts_sorted.items():
+        if tool not in duplicates:
+            matches = process.extractBests(
+                tool,
+                tool_counts_sorted.index,
+                scorer=lambda str1, str2: fuzz.ratio(
+                    str1.lower(), str2.lower()
+                ),
+                score_cutoff=70
+            )
+
+            filtered_matches = {
+                match for match, score in matches if match != tool and (
+                    match.lower().startswith(tool.lower()) or score >= 85
+                    )
+            }
+
+            unq_words[tool] = count + sum(
+                tool_counts[match] for match in filtered_matches
+            )
+            duplicates |= filtered_matches
+
+    return unq_words
+
+
+def random_word(rnd: random.Random) -> str:
+    word = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(1, 9)))
+    return rnd.choice((word, word.capitalize(), word.upper()))
+
+
+def make_skills_counts(count: int, seed: int = 0) -> pd.Series:
+    """Skills names with their variants, like scraped skills counts"""
+    rnd = random.Random(seed)
+    skills = set()
+
+    while len(skills) < count:
+        skill = random_word(rnd)
+        if rnd.random() < 0.3:
+            skill += " " + random_word(rnd)
+        skills.add(skill)
+
+        for _ in range(rnd.randint(0, 3)):
+            variant = skill + rnd.choice(SUFFIXES)
+            skills.add(rnd.choice((variant, variant.lower())))
+
+    names = sorted(skills)[:count]
+    return pd.Series(
+        [rnd.randint(1, 500) for _ in names], index=names
+    ).sort_values(ascending=False)
+
+
+def measure(func, counts: pd.Series) -> float:
+    return min(timeit.repeat(lambda: func(counts), number=1, repeat=3))
+
+
+def main() -> None:
+    for size in SIZES:
+        counts = make_skills_counts(size)
+        engine = measure(canonical_skills, counts)
+        line = f"{size} skills: engine {engine:.3f}s"
+        if size <= PREVIOUS_MAX_SKILLS:
+            line += (
+                ", previous "
+                f"{measure(previous_removing_duplicates, counts):.3f}s"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of skills extraction per 1,000 vacancy descriptions.
+
+Compares the previous path (regex pattern built on every 'filter_text'
+call and stopwords of every NLTK language loaded for every word) with
+the process-wide 'SkillsExtractor' engine.
+
+Run from the project root:
+    python -m benchmarks.skills_extraction
+"""
+import random
+import timeit
+
+from nltk.corpus import stopwords
+from w3lib.html import remove_tags
+
+from scraping.items import get_skills_extractor, skills_pattern
+
+DESCRIPTIONS = 1000
+WORDS = (
+    "Python", "Django", "REST Framework", "PostgreSQL", "Docker", "AWS",
+    "experience", "with", "and", "the", "Knowledge", "of", "Team", "is",
+    "good", "Kubernetes", "CI/CD", "Linux", "English", "Celery", "Redis",
+)
+
+
+def make_descriptions(count: int) -> list[list[str]]:
+    """Descriptions look like vacancy requirements: list of <li> texts"""
+    rnd = random.Random(0)
+    return [
+        [
+            "<li>" + " ".join(rnd.choices(WORDS, k=12)) + "</li>"
+            for _ in range(rnd.randint(3, 8))
+        ]
+        for _ in range(count)
+    ]
+
+
+def previous_clean_skills(texts: list[str]) -> set[str]:
+    skills = set().union(*(
+        set(skills_pattern().findall(remove_tags(text))) for text in texts
+    ))
+    return {
+        word for word in skills
+        if word.lower() not in set(stopwords.words())
+    }
+
+
+def engine_clean_skills(texts: list[str]) -> set[str]:
+    return set().union(*get_skills_extractor().extract(texts))
+
+
+def main() -> None:
+    descriptions = make_descriptions(DESCRIPTIONS)
+    # load stopwords and compile pattern before measuring
+    get_skills_extractor()
+
+    results = {}
+    for name, func in (
+            ("previous", previous_clean_skills),
+            ("engine", engine_clean_skills),
+    ):
+        results[name] = min(timeit.repeat(
+            lambda: [func(texts) for texts in descriptions],
+            number=1,
+            repeat=3
+        ))
+        print(f"{name:>10}: {results[name]:.3f}s per {DESCRIPTIONS} "
+              "descriptions")
+
+    print(f"   speedup: {results['previous'] / results['engine']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark of 'find_capitalized_phrases' tokenizer against
+'skills_pattern' regex on descriptions and pathological inputs where
+the regex backtracks. Parity of them is tested in
+'tests/test_skills_tokenizer.py'.
+
+Run from the project root:
+    python -m benchmarks.skills_tokenizer
+"""
+import timeit
+
+from scraping.items import find_capitalized_phrases, skills_pattern
+from benchmarks.skills_extraction import make_descriptions
+
+
+def pathological_texts(size: int) -> dict[str, str]:
+    return {
+        "phrase before ':'": "x " + "Word " * size + "Word:",
+        "short words before ':'": "x " + "Ab " * size + "Ab:",
+        "word with digit": "x " + "Ab" * size + "1 ",
+    }
+
+
+def measure(func, texts: list[str]) -> float:
+    return min(timeit.repeat(
+        lambda: [func(text) for text in texts], number=1, repeat=3
+    ))
+
+
+def main() -> None:
+    pattern = skills_pattern()
+    descriptions = [
+        text for description in make_descriptions(1000)
+        for text in description
+    ]
+
+    print(
+        f"descriptions: regex {measure(pattern.findall, descriptions):.3f}s,"
+        f" tokenizer {measure(find_capitalized_phrases, descriptions):.3f}s"
+    )
+
+    for size in (100, 200, 400):
+        for name, text in pathological_texts(size).items():
+            print(
+                f"{name} x{size}: "
+                f"regex {measure(pattern.findall, [text]):.4f}s, "
+                f"tokenizer {measure(find_capitalized_phrases, [text]):.4f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
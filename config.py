@@ -7,3 +7,6 @@ Project common setting configurations
 POSITION = "python"
 
 JOB_URL = f"https://theprotocol.it/filtry/{POSITION};t"
+
+# NLTK stopwords languages, words from them are not counted as skills
+STOPWORDS_LANGUAGES = ["english", "russian"]
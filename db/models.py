@@ -7,6 +7,7 @@ from sqlalchemy import (
     Integer,
     func
 )
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import date
 
@@ -14,6 +15,12 @@ from db.connnect_db import Base
 
 dotenv.load_dotenv()
 
+# skills differing only in case are different aliases,
+# so MySQL has to compare them case-sensitive
+SKILL_NAME = String(300).with_variant(
+    mysql.VARCHAR(300, charset="utf8mb4", collation="utf8mb4_bin"), "mysql"
+)
+
 
 class ScrapingResultFileMetaData(Base):
     """Model for saving metadata of scraping result"""
@@ -32,6 +39,8 @@ class ScrapingResultFileMetaData(Base):
         nullable=True
     )
     created_at = Column(Date, default=date.today())
+    # skills cube aggregated from the file, which diagrams are made of
+    cube_file_name = Column(String(300), nullable=True)
 
     @hybrid_property
     def file_path(self):
@@ -49,3 +58,27 @@ class ScrapingResultFileMetaData(Base):
         return func.concat(
             os.getenv("SCRAPING_RESULT_DIR"), "/", cls.file_name
         )
+
+    @hybrid_property
+    def cube_file_path(self):
+        if self.cube_file_name is None:
+            return None
+        return os.path.join(
+            os.getenv("SCRAPING_RESULT_DIR"),
+            self.cube_file_name
+        )
+
+    @cube_file_path.expression
+    def cube_file_path(cls):
+        """Null for files saved without skills cube"""
+        return func.concat(
+            os.getenv("SCRAPING_RESULT_DIR"), "/", cls.cube_file_name
+        )
+
+
+class SkillAlias(Base):
+    """Model mapping skill as it was scraped to its canonical skill"""
+    __tablename__ = "skill_aliases"
+
+    alias = Column(SKILL_NAME, primary_key=True)
+    skill = Column(SKILL_NAME, nullable=False, index=True)
@@ -0,0 +1,38 @@
+"""Create table SkillAlias
+
+Revision ID: 5f2b8d41a7c3
+Revises: c09617cc24ab
+Create Date: 2026-10-18 12:52:04.218530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2b8d41a7c3'
+down_revision: Union[str, None] = 'c09617cc24ab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SKILL_NAME = sa.String(length=300).with_variant(
+    mysql.VARCHAR(length=300, charset='utf8mb4', collation='utf8mb4_bin'),
+    'mysql'
+)
+
+
+def upgrade() -> None:
+    op.create_table('skill_aliases',
+    sa.Column('alias', SKILL_NAME, nullable=False),
+    sa.Column('skill', SKILL_NAME, nullable=False),
+    sa.PrimaryKeyConstraint('alias')
+    )
+    op.create_index(op.f('ix_skill_aliases_skill'), 'skill_aliases', ['skill'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_skill_aliases_skill'), table_name='skill_aliases')
+    op.drop_table('skill_aliases')
@@ -0,0 +1,84 @@
+"""
+Cache of scraped vacancies, so unchanged vacancy pages are not
+processed again. Vacancies in seen vacancies index are not downloaded,
+so cache serves only vacancies scraped again after they expired from
+the index ('SEEN_VACANCIES_EXPIRE_DAYS').
+"""
+import json
+import time
+import sqlite3
+from typing import Optional
+
+from scraping.items import VacancyItem
+
+# item fields which are sets, JSON keeps them as lists
+SET_FIELDS = ("required_skills", "optional_skills")
+
+
+class VacancyItemCache:
+    """
+    SQLite cache keyed by vacancy URL, which keeps hash of vacancy page
+    content together with VacancyItem scraped from it. Only 'max_size'
+    recently used vacancies are kept, the rest is evicted in 'close'.
+    """
+    def __init__(self, path: str, max_size: int) -> None:
+        self.max_size = max_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS vacancy_items ("
+            "url TEXT PRIMARY KEY, "
+            "content_hash TEXT NOT NULL, "
+            "item TEXT NOT NULL, "
+            "used_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def item_to_json(item: VacancyItem) -> str:
+        return json.dumps({
+            field: sorted(value) if field in SET_FIELDS else value
+            for field, value in item.items()
+        })
+
+    @staticmethod
+    def item_from_json(data: str) -> VacancyItem:
+        return VacancyItem(**{
+            field: set(value) if field in SET_FIELDS else value
+            for field, value in json.loads(data).items()
+        })
+
+    def get(self, url: str, content_hash: str) -> Optional[VacancyItem]:
+        """Get cached item, if vacancy page content has not changed"""
+        row = self.connection.execute(
+            "SELECT item FROM vacancy_items "
+            "WHERE url = ? AND content_hash = ?",
+            (url, content_hash)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self.connection.execute(
+            "UPDATE vacancy_items SET used_at = ? WHERE url = ?",
+            (time.time(), url)
+        )
+        return self.item_from_json(row[0])
+
+    def set(self, url: str, content_hash: str, item: VacancyItem) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO vacancy_items "
+            "(url, content_hash, item, used_at) VALUES (?, ?, ?, ?)",
+            (url, content_hash, self.item_to_json(item), time.time())
+        )
+
+    def evict(self) -> None:
+        """Remove least recently used items over 'max_size'"""
+        self.connection.execute(
+            "DELETE FROM vacancy_items WHERE url NOT IN ("
+            "SELECT url FROM vacancy_items ORDER BY used_at DESC LIMIT ?)",
+            (self.max_size,)
+        )
+
+    def close(self) -> None:
+        self.evict()
+        self.connection.commit()
+        self.connection.close()
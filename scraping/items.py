@@ -3,6 +3,8 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 import re
+from functools import lru_cache
+from typing import Iterable, Optional
 
 import nltk
 from nltk.corpus import stopwords
@@ -14,9 +16,145 @@ from w3lib.html import remove_tags
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
 
+from config import STOPWORDS_LANGUAGES
+
 nltk.download("stopwords")
 
 
+def skills_pattern() -> re.Pattern:
+    """
+    Regex for capitalized phrases, kept as reference of
+    'find_capitalized_phrases' behaviour. It backtracks heavily on long
+    phrases followed by ':', so it's not used for extraction.
+    """
+    # regex patterns supports Ukraine, English and Russia languages
+    re_lang = "[A-Z][a-zżźćńółęąś]"
+    # ignore capitalize words with 'not_start' char before them
+    not_start = "[-.]"
+    # compile the pattern for performance optimization
+    return re.compile(
+        (
+            r"(?<!^)"  # ignore words at the beginning of a new line
+            # - Competitive | .Competitive
+            fr"(?<!{not_start})(?<!{not_start} )\b"
+            # matching pattern
+            # capturing capitalize word
+            f"(?:{re_lang}*)+"
+            # consecutive capitalize words with
+            # special characters between them, except (/,\)
+            rf"(?:[^\w](?:{re_lang}*)+)*"
+            # ignore words with ":" at the end ex. 'Skills:'
+            rf"\b(?!(?: (?:{re_lang}*)+)*:)"
+        )
+    )
+
+
+# single words are matched by simple patterns without nested
+# quantifiers, which are linear time
+WORD = re.compile(r"\w+")
+# whole capitalized word, the same letters as in 'skills_pattern'
+CAPITALIZED_WORD = re.compile("[A-Z][A-Za-zżźćńółęąś]*")
+# ignore capitalize words with this chars (and space) before them
+NOT_START = "-."
+
+
+def capitalized_words(text: str) -> list[tuple[int, int]]:
+    """Get (start, end) of whole capitalized words"""
+    return [
+        word.span() for word in WORD.finditer(text)
+        if CAPITALIZED_WORD.fullmatch(word.group())
+    ]
+
+
+def can_start_phrase(text: str, start: int) -> bool:
+    """Phrase is not at the beginning of the text or after 'NOT_START'"""
+    if start == 0 or text[start - 1] in NOT_START:
+        return False
+    return not (
+        text[start - 1] == " " and start > 1 and text[start - 2] in NOT_START
+    )
+
+
+def find_capitalized_phrases(text: str) -> list[str]:
+    """
+    Linear time tokenizer returning the same phrases as
+    'skills_pattern().findall(text)'. Phrase is consecutive capitalized
+    words separated by exactly one non-word char, it's shortened from
+    the end until it is not followed by ' Capitalized Words:'
+    ex. 'Skills:'.
+    """
+    words = capitalized_words(text)
+
+    # index of the last word phrase starting with the word may end on
+    phrase_end: list[Optional[int]] = [None] * len(words)
+    # word is followed by ' Capitalized Words:'
+    before_colon = False
+
+    # go from the end, so each word is checked only once
+    for i in range(len(words) - 1, -1, -1):
+        end = words[i][1]
+        next_char = text[end:end + 1]
+        # next word is separated by exactly one non-word char
+        joined = i + 1 < len(words) and words[i + 1][0] == end + 1
+
+        before_colon = next_char == ":" or (
+            next_char == " " and joined and before_colon
+        )
+
+        if joined and phrase_end[i + 1] is not None:
+            phrase_end[i] = phrase_end[i + 1]
+        elif not before_colon:
+            phrase_end[i] = i
+
+    phrases = []
+    i = 0
+    while i < len(words):
+        start = words[i][0]
+        last = phrase_end[i]
+
+        if last is not None and can_start_phrase(text, start):
+            phrases.append(text[start:words[last][1]])
+            i = last + 1
+        else:
+            i += 1
+
+    return phrases
+
+
+class SkillsExtractor:
+    """
+    Skills extraction engine, stopwords are loaded only once,
+    when engine is created. Use
+    'get_skills_extractor' to get one engine shared by whole process.
+    """
+
+    def __init__(self, languages: Iterable[str]) -> None:
+        self.stopwords = frozenset(
+            word.lower() for word in stopwords.words(list(languages))
+        )
+
+    def filter_text(self, text: str) -> set[str]:
+        """Aims for getting skills from text, by finding capitalize words"""
+        return set(find_capitalized_phrases(text))
+
+    def removing_stopwords(self, words: set[str]) -> set[str]:
+        """Removing stopwords, using NLTK stopwords"""
+        return {word for word in words if word.lower() not in self.stopwords}
+
+    def extract(self, texts: list[str]) -> list[set[str]]:
+        """Get clean skills from each of the texts"""
+        return [
+            self.removing_stopwords(self.filter_text(remove_tags(text)))
+            for text in texts
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_skills_extractor() -> SkillsExtractor:
+    """Skills extraction engine shared by whole process"""
+    return SkillsExtractor(languages=STOPWORDS_LANGUAGES)
+
+
 class VacancySkills:
     """
     Class for getting skills from text, it's just looking
@@ -27,31 +165,7 @@ class VacancySkills:
 
     def __init__(self, texts: list[str]) -> None:
         self.texts = texts
-
-    @property
-    def re_pattern(self) -> re.Pattern:
-        # regex patterns supports Ukraine, English and Russia languages
-        re_lang = "[A-Z][a-zżźćńółęąś]"
-        # ignore capitalize words with 'not_start' char before them
-        not_start = "[-.]"
-        # compile the pattern for performance optimization
-        return re.compile(
-            (
-                r"(?<!^)"  # ignore words at the beginning of a new line
-                # - Competitive | .Competitive
-                fr"(?<!{not_start})(?<!{not_start} )\b"
-                # matching pattern
-                # capturing capitalize word
-                f"(?:{re_lang}*)+"
-                # consecutive capitalize words with
-                # special characters between them, except (/,\)
-                rf"(?:[^\w](?:{re_lang}*)+)*"
-                # ignore words with ":" at the end ex. 'Skills:'
-                f"\b(?!(?: (?:{re_lang}*)+)*:)"
-            )
-        )
-
-    pattern = re_pattern
+        self.extractor = get_skills_extractor()
 
     def get_skills(self) -> set:
         """Return set with skills"""
@@ -61,21 +175,15 @@ class VacancySkills:
 
     def filter_text(self, text: str) -> set[str]:
         """Aims for getting skills from text, by finding capitalize words"""
-        # we do not want to match this words
-        return set(self.pattern.findall(text))
+        return self.extractor.filter_text(text)
 
-    @staticmethod
-    def removing_stopwords(words: set[str]) -> set[str]:
+    def removing_stopwords(self, words: set[str]) -> set[str]:
         """Removing stopwords, using NLTK stopwords"""
-        result = {
-            word for word in words
-            if word.lower() not in set(stopwords.words())
-        }
-        return result
+        return self.extractor.removing_stopwords(words)
 
     def get_clean_skills(self) -> set[str]:
         """Applying all filters to get skills for POSITION"""
-        return self.removing_stopwords(self.get_skills())
+        return set().union(*self.extractor.extract(self.texts))
 
 
 def removing_duplicates(skills: set[str]) -> list[str]:
@@ -3,20 +3,148 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 import os
+import queue
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from importlib import import_module
 
 from scrapy.http import Response, Request
 from scrapy.http.response.html import HtmlResponse
 from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest
 from scrapy.spiders import Spider
-from scrapy.exceptions import CloseSpider
 from scrapy_selenium4 import SeleniumMiddleware, SeleniumRequest
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support.wait import WebDriverWait
-from typing import Optional
+from twisted.internet.defer import Deferred
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
+from typing import Callable, Iterable, Optional
 from dotenv import load_dotenv
 
-from config import JOB_URL
+from scraping.signals import items_written
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class SeleniumDriverPool:
+    """
+    Pool of selenium drivers, each driver loads one page at a time.
+    Driver is recycled (quit and started again) after 'max_pages' pages
+    or after it crashed. Drivers are started and quit lazily in
+    'acquire', which is called from the thread pool, so the reactor
+    thread is never blocked by it.
+
+    Driver leased longer than 'lease_seconds' is taken back and recycled,
+    since its response was dropped before the spider could release it.
+    """
+    # how often waiting 'acquire' checks for expired leases and closing
+    ACQUIRE_POLL_SECONDS = 1
+
+    def __init__(
+            self,
+            create_driver: Callable[[], WebDriver],
+            size: int,
+            max_pages: int = 0,
+            lease_seconds: int = 300
+    ) -> None:
+        self.create_driver = create_driver
+        self.max_pages = max_pages
+        self.lease_seconds = lease_seconds
+        self.closed = False
+        self.lock = threading.Lock()
+        # number of pages loaded by each started driver
+        self.pages: dict[WebDriver, int] = {}
+        # leased driver: time it was leased
+        self.leased: dict[WebDriver, float] = {}
+        self.broken: set[WebDriver] = set()
+        # 'None' is a free slot for a driver which is not started yet
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(None)
+
+    def must_recycle(self, driver: WebDriver) -> bool:
+        return driver in self.broken or (
+            self.max_pages and self.pages[driver] >= self.max_pages
+        )
+
+    def acquire(self) -> WebDriver:
+        """Take idle driver, blocks until one of drivers is released"""
+        while True:
+            if self.closed:
+                raise IgnoreRequest("Selenium driver pool is closed")
+            try:
+                driver = self.idle.get(timeout=self.ACQUIRE_POLL_SECONDS)
+                break
+            except queue.Empty:
+                self.release_expired()
+
+        if driver is not None and self.must_recycle(driver):
+            self.quit(driver)
+            driver = None
+
+        if driver is None:
+            try:
+                driver = self.create_driver()
+            except Exception:
+                # give slot back, so next request can try again
+                self.idle.put(None)
+                raise
+            with self.lock:
+                self.pages[driver] = 0
+
+        with self.lock:
+            self.pages[driver] += 1
+            self.leased[driver] = time.monotonic()
+        return driver
+
+    def release(self, driver: WebDriver, broken: bool = False) -> None:
+        """Give driver back to the pool, it is safe to call it twice"""
+        with self.lock:
+            if self.leased.pop(driver, None) is None:
+                return
+            if broken:
+                self.broken.add(driver)
+        self.idle.put(driver)
+
+    def release_expired(self) -> None:
+        """Take back drivers leased longer than 'lease_seconds'"""
+        expire_time = time.monotonic() - self.lease_seconds
+        with self.lock:
+            expired = [
+                driver for driver, leased_at in self.leased.items()
+                if leased_at < expire_time
+            ]
+        for driver in expired:
+            logger.warning(
+                "Selenium driver was not released for %s seconds, "
+                "it is recycled",
+                self.lease_seconds
+            )
+            self.release(driver, broken=True)
+
+    def quit(self, driver: WebDriver) -> None:
+        with self.lock:
+            self.pages.pop(driver, None)
+            self.broken.discard(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            logger.warning("Selenium driver could not be quit properly")
+
+    def close(self) -> None:
+        """Quit all started drivers, waiting 'acquire' calls give up"""
+        self.closed = True
+        for driver in list(self.pages):
+            self.quit(driver)
 
 
 class DownloadSeleniumMiddleware(SeleniumMiddleware):
@@ -27,94 +155,430 @@ class DownloadSeleniumMiddleware(SeleniumMiddleware):
     old SeleniumMiddleware.process_request ignores request from
     Request and not setting all meta[] dependencies like 'driver'
     that I need.
+
+    Pages are loaded by 'SELENIUM_POOL_SIZE' drivers in a thread pool and
+    returned to Scrapy as Deferred, so the reactor thread is not blocked
+    while page is loading. Driver exposed in response.meta["driver"] is
+    kept out of the pool until 'SeleniumDriverReleaseMiddleware' gives it
+    back after the spider callback.
+
+    With 'SELENIUM_HYBRID_MODE' enabled only SeleniumRequest (listing
+    pages) goes through the browser, plain Request (vacancy pages) is
+    downloaded by Scrapy downloader concurrently and only if static HTML
+    does not have 'spider.static_page_selectors' request is repeated
+    using the browser.
     """
-    def process_request(self, request: SeleniumRequest, spider):
+    hybrid_mode = False
+    stats = None
+
+    def __init__(
+            self,
+            driver_name: str,
+            driver_executable_path: Optional[str],
+            browser_executable_path: Optional[str],
+            command_executor: Optional[str],
+            driver_arguments: list[str]
+    ) -> None:
+        # drivers are started by the pool, instead of one 'self.driver'
+        self.driver_name = driver_name
+        self.driver_executable_path = driver_executable_path
+        self.browser_executable_path = browser_executable_path
+        self.command_executor = command_executor
+        self.driver_arguments = driver_arguments
+        self.pool: Optional[SeleniumDriverPool] = None
+        self.thread_pool: Optional[ThreadPool] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = super().from_crawler(crawler)
+        middleware.hybrid_mode = crawler.settings.getbool(
+            "SELENIUM_HYBRID_MODE"
+        )
+        middleware.stats = crawler.stats
+
+        pool_size = crawler.settings.getint("SELENIUM_POOL_SIZE", 1)
+        middleware.pool = SeleniumDriverPool(
+            create_driver=middleware.create_driver,
+            size=pool_size,
+            max_pages=crawler.settings.getint("SELENIUM_DRIVER_MAX_PAGES", 0),
+            lease_seconds=crawler.settings.getint(
+                "SELENIUM_DRIVER_LEASE_SECONDS", 300
+            )
+        )
+        middleware.thread_pool = ThreadPool(
+            minthreads=0, maxthreads=pool_size, name="selenium"
+        )
+        middleware.thread_pool.start()
+        return middleware
+
+    def create_driver(self) -> WebDriver:
+        """Start new selenium driver using crawler settings"""
+        webdriver_base_path = f"selenium.webdriver.{self.driver_name}"
+
+        driver_klass = import_module(f"{webdriver_base_path}.webdriver")
+        driver_options_klass = import_module(f"{webdriver_base_path}.options")
+
+        driver_options = driver_options_klass.Options()
+        if self.browser_executable_path:
+            driver_options.binary_location = self.browser_executable_path
+        for argument in self.driver_arguments:
+            driver_options.add_argument(argument)
+
+        # remote driver
+        if self.driver_executable_path is None:
+            return webdriver.Remote(
+                command_executor=self.command_executor,
+                options=driver_options
+            )
+
+        # locally installed driver
+        service_klass = import_module(f"{webdriver_base_path}.service")
+        return driver_klass.WebDriver(
+            service=service_klass.Service(
+                executable_path=self.driver_executable_path
+            ),
+            options=driver_options
+        )
+
+    def use_browser(self, request: Request) -> bool:
+        """Check if request has to be downloaded using selenium driver"""
+        if not self.hybrid_mode:
+            return True
+        return (
+            isinstance(request, SeleniumRequest)
+            or request.meta.get("selenium_fallback", False)
+        )
+
+    def process_request(
+            self,
+            request: SeleniumRequest,
+            spider: Spider
+    ) -> Optional[Deferred]:
         """Process a request using the selenium driver if applicable"""
 
         if not isinstance(request, Request):
             return None
 
-        self.driver.get(request.url)
+        if not self.use_browser(request):
+            self.stats.inc_value("selenium/hybrid/http", spider=spider)
+            return None
+
+        if self.hybrid_mode:
+            self.stats.inc_value("selenium/hybrid/browser", spider=spider)
 
-        for cookie_name, cookie_value in request.cookies.items():
-            self.driver.add_cookie(
-                {
-                    "name": cookie_name,
-                    "value": cookie_value
-                }
-            )
-        # Only SeleniumRequest has wait_until/screenshot/execute_script
-        # attributes not Request
-        if isinstance(request, SeleniumRequest):
-            if request.wait_until:
-                WebDriverWait(
-                    self.driver, request.wait_time
-                ).until(request.wait_until)
-
-            if request.screenshot:
-                request.meta["screenshot"] = (
-                    self.driver.get_screenshot_as_png()
+        # import reactor here, so it is not installed before Scrapy
+        # installs 'TWISTED_REACTOR'
+        from twisted.internet import reactor
+
+        return deferToThreadPool(
+            reactor, self.thread_pool, self.download, request
+        )
+
+    def download(self, request: Request) -> HtmlResponse:
+        """Load page using driver from the pool, runs in the thread pool"""
+        driver = self.pool.acquire()
+
+        try:
+            driver.get(request.url)
+
+            for cookie_name, cookie_value in request.cookies.items():
+                driver.add_cookie(
+                    {
+                        "name": cookie_name,
+                        "value": cookie_value
+                    }
                 )
+            # Only SeleniumRequest has wait_until/screenshot/execute_script
+            # attributes not Request
+            if isinstance(request, SeleniumRequest):
+                if request.wait_until:
+                    WebDriverWait(
+                        driver, request.wait_time
+                    ).until(request.wait_until)
 
-            if request.script:
-                self.driver.execute_script(request.script)
+                if request.screenshot:
+                    request.meta["screenshot"] = (
+                        driver.get_screenshot_as_png()
+                    )
 
-        body = str.encode(self.driver.page_source)
+                if request.script:
+                    driver.execute_script(request.script)
+
+            body = str.encode(driver.page_source)
+            url = driver.current_url
+        except TimeoutException:
+            self.pool.release(driver)
+            raise
+        except Exception:
+            # driver may be crashed, so it will be started again
+            self.pool.release(driver, broken=True)
+            raise
 
         # Expose the driver via the "meta" attribute
-        request.meta.update({"driver": self.driver})
+        request.meta.update({"driver": driver, "driver_pool": self.pool})
 
         return HtmlResponse(
-            self.driver.current_url,
+            url,
             body=body,
             encoding="utf-8",
             request=request
         )
 
+    def process_response(
+            self,
+            request: Request,
+            response: Response,
+            spider: Spider
+    ) -> Response | Request:
+        """
+        Repeat request using the selenium driver if page downloaded
+        by Scrapy downloader is missing elements the spider needs,
+        because they are rendered by JavaScript.
+        """
+        if (
+                self.use_browser(request)
+                or not isinstance(response, HtmlResponse)
+        ):
+            return response
+
+        selectors = getattr(spider, "static_page_selectors", ())
+        if all(response.css(selector) for selector in selectors):
+            return response
+
+        self.stats.inc_value("selenium/hybrid/fallback", spider=spider)
+        return request.replace(
+            meta={**request.meta, "selenium_fallback": True},
+            dont_filter=True
+        )
+
+    def spider_closed(self, spider: Spider = None) -> None:
+        """Report how many pages took each download path"""
+        if self.hybrid_mode:
+            logger.info(
+                "Hybrid download mode: %s pages by HTTP, "
+                "%s pages by browser (%s fallbacks)",
+                self.stats.get_value("selenium/hybrid/http", 0),
+                self.stats.get_value("selenium/hybrid/browser", 0),
+                self.stats.get_value("selenium/hybrid/fallback", 0),
+            )
+        # pool is closed first, so threads waiting for a driver finish
+        # and thread pool can join them
+        self.pool.close()
+        self.thread_pool.stop()
 
-class CacheUrlMiddleware:
-    def __init__(self):
-        # TODO: make value of cache_file to a global configurations
-        self.cache_file = os.getenv("CACHE_FILE_LAST_VACANCY")
-        self.last_vacancy_url = self.read_last_vc_url()
-        self.first_vacancy_url: Optional[str] = None
 
-    def read_last_vc_url(self) -> str:
+class SeleniumDriverReleaseMiddleware:
+    """
+    Give selenium driver from response.meta["driver"] back to the pool
+    after spider callback is done with it.
+    """
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        middleware = cls()
+        # callback errors may skip 'process_spider_exception', when
+        # another middleware handles them first
+        crawler.signals.connect(
+            middleware.spider_error, signal=signals.spider_error
+        )
+        return middleware
+
+    @staticmethod
+    def release_driver(response: Response) -> None:
+        pool = response.meta.get("driver_pool")
+        if pool is not None:
+            pool.release(response.meta["driver"])
+
+    def process_spider_output(
+            self,
+            response: Response,
+            result: Iterable,
+            spider: Spider
+    ) -> Iterable:
         try:
-            with open(self.cache_file, "r") as f:
-                return f.read().strip()
-        except FileNotFoundError:
-            return ""
+            yield from result
+        finally:
+            self.release_driver(response)
+
+    def process_spider_exception(
+            self,
+            response: Response,
+            exception: Exception,
+            spider: Spider
+    ) -> None:
+        self.release_driver(response)
+
+    def spider_error(
+            self,
+            failure: Failure,
+            response: Response,
+            spider: Spider
+    ) -> None:
+        self.release_driver(response)
+
+
+class SeenVacancyIndex:
+    """
+    Persistent SQLite index of scraped vacancies, keyed by request
+    fingerprint with the date vacancy was seen last time.
+    Changes are committed when items are written to the partial file of
+    scraping result and in 'close', so killed run does not mark vacancies
+    as seen before their items are saved.
+    """
+    def __init__(self, path: str) -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen_vacancies ("
+            "fingerprint TEXT PRIMARY KEY, "
+            "url TEXT NOT NULL, "
+            "last_seen DATE NOT NULL)"
+        )
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM seen_vacancies WHERE fingerprint = ?",
+            (fingerprint,)
+        ).fetchone() is not None
+
+    def add(self, fingerprint: str, url: str) -> None:
+        """Add vacancy or update its last seen date"""
+        self.connection.execute(
+            "INSERT INTO seen_vacancies (fingerprint, url, last_seen) "
+            "VALUES (?, ?, ?) ON CONFLICT(fingerprint) "
+            "DO UPDATE SET last_seen = excluded.last_seen",
+            (fingerprint, url, date.today().isoformat())
+        )
+
+    def remove_expired(self, days: int) -> None:
+        """Forget vacancies which were not seen for 'days' days"""
+        expire_date = date.today() - timedelta(days=days)
+        self.connection.execute(
+            "DELETE FROM seen_vacancies WHERE last_seen < ?",
+            (expire_date.isoformat(),)
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
 
-    def save_last_vc_url(self, vc_url: str) -> None:
-        with open(self.cache_file, "w") as f:
-            f.write(vc_url)
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+
+def is_seen_page(request: Request, spider: Spider) -> bool:
+    """Check if listing page goes after the first page of seen vacancies"""
+    seen_page_num = getattr(spider, "seen_page_num", None)
+    return bool(seen_page_num) and request.meta["page_num"] > seen_page_num
+
+
+class SeenVacancyMiddleware:
+    """
+    Skip vacancies scraped in previous runs before their page is
+    downloaded and stop scraping listing pages once a full listing page
+    has no unseen vacancies (listing is ordered from the newest). Number
+    of the page is kept in 'spider.seen_page_num', so pages after it,
+    which are already scheduled, are skipped by
+    'SeenListingPagesMiddleware'.
+    """
+    def __init__(self, crawler: Crawler) -> None:
+        self.fingerprinter = crawler.request_fingerprinter
+        self.stats = crawler.stats
+        self.index = SeenVacancyIndex(
+            os.getenv("SEEN_VACANCIES_INDEX_FILE", "seen_vacancies.sqlite3")
+        )
+        expire_days = crawler.settings.getint("SEEN_VACANCIES_EXPIRE_DAYS")
+        if expire_days:
+            self.index.remove_expired(expire_days)
 
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls()
+        middleware = cls(crawler)
         crawler.signals.connect(
             middleware.spider_closed, signal=signals.spider_closed
         )
+        # vacancy is added to index after its item is passed to pipeline,
+        # so all added vacancies have their items written
+        crawler.signals.connect(
+            middleware.index.commit, signal=items_written
+        )
         return middleware
 
-    def process_spider_input(
+    def fingerprint(self, request: Request) -> str:
+        return self.fingerprinter.fingerprint(request).hex()
+
+    @staticmethod
+    def is_listing(request: Request) -> bool:
+        return "page_num" in request.meta
+
+    def process_spider_output(
             self,
             response: Response,
+            result: Iterable,
             spider: Spider
-    ) -> Optional[None]:
-        # we do not want to cash response url which gets all vacancies
-        if not self.first_vacancy_url and response.url != JOB_URL:
-            # Remember the first vacancy URL
-            self.first_vacancy_url = response.url
-
-        if self.last_vacancy_url and response.url == self.last_vacancy_url:
-            # Stop processing further requests if we
-            # encounter the last vacancy URL
-            raise CloseSpider(
-                reason=f"Encountered last vacancy URL: {self.last_vacancy_url}"
-            )
+    ) -> Iterable:
+        if not self.is_listing(response.request):
+            yield from result
+            # vacancy has been scraped
+            self.index.add(self.fingerprint(response.request), response.url)
+            return
+
+        seen = unseen = 0
+        for entry in result:
+            if not isinstance(entry, Request):
+                yield entry
+
+            elif self.is_listing(entry):
+                # vacancies of the page go before its listing requests
+                if seen and not unseen:
+                    self.set_seen_page(response, spider)
+                if is_seen_page(entry, spider):
+                    self.stats.inc_value(
+                        "seen_vacancies/skipped_pages", spider=spider
+                    )
+                    continue
+                yield entry
+
+            elif self.fingerprint(entry) in self.index:
+                seen += 1
+                self.index.add(self.fingerprint(entry), entry.url)
+                self.stats.inc_value("seen_vacancies/skipped", spider=spider)
+
+            else:
+                unseen += 1
+                yield entry
+
+        if seen and not unseen:
+            self.set_seen_page(response, spider)
+
+    @staticmethod
+    def set_seen_page(response: Response, spider: Spider) -> None:
+        """Remember listing page as the first without unseen vacancies"""
+        page_num = response.meta["page_num"]
+        spider.seen_page_num = min(
+            getattr(spider, "seen_page_num", None) or page_num, page_num
+        )
 
     def spider_closed(self, spider: Spider) -> None:
-        if self.first_vacancy_url:
-            self.save_last_vc_url(self.first_vacancy_url)
+        self.index.close()
+
+
+class SeenListingPagesMiddleware:
+    """
+    Downloader middleware skipping scheduled listing pages after the first
+    listing page without unseen vacancies, see 'SeenVacancyMiddleware'
+    """
+    def __init__(self, crawler: Crawler) -> None:
+        self.stats = crawler.stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_request(self, request: Request, spider: Spider) -> None:
+        if "page_num" in request.meta and is_seen_page(request, spider):
+            self.stats.inc_value(
+                "seen_vacancies/skipped_pages", spider=spider
+            )
+            raise IgnoreRequest(
+                f"Listing page {request.meta['page_num']} goes after page "
+                f"{spider.seen_page_num} without unseen vacancies"
+            )
@@ -6,16 +6,153 @@
 
 # useful for handling different item types with a single interface
 import os
+import glob
+import logging
 import dotenv
-from datetime import date
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterator
 from scrapy import Item, Spider
+from scrapy.crawler import Crawler
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
+from analyzing.skill_aliases import add_skill_aliases, file_skills
+from analyzing.skills_cube import cube_file_name, write_skills_cube
+from scraping.schema import PARTIAL_SCHEMA, VACANCIES_SCHEMA
+from scraping.signals import items_written
 from db.models import ScrapingResultFileMetaData
 from db.connnect_db import session
 
 dotenv.load_dotenv()
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y_%m_%d"
+# scraped items are streamed to this file and converted
+# to feather file when scraping is finished
+PARTIAL_FILE_EXTENSION = ".arrows"
+# each run writes new numbered partial file of the day, e.g.
+# 'vacancies_2024_01_01.2.arrows', so partial files of killed
+# runs are never written again
+PARTIAL_FILE_NUMBER_SEPARATOR = "."
+
+COMPRESSION = "zstd"
+
+
+class DictionaryEncoder:
+    """
+    Dictionary encode strings batch by batch with one growing dictionary,
+    so dictionary of each batch extends dictionary of the previous one
+    and it can be written to feather file as dictionary delta.
+    """
+    def __init__(self) -> None:
+        self.dictionary = pa.array([], pa.string())
+
+    def encode(self, values: pa.Array) -> pa.DictionaryArray:
+        new_values = pc.unique(pc.drop_null(
+            values.filter(pc.invert(pc.is_in(values, self.dictionary)))
+        ))
+        self.dictionary = pa.concat_arrays([self.dictionary, new_values])
+
+        return pa.DictionaryArray.from_arrays(
+            pc.index_in(values, self.dictionary).cast(pa.int32()),
+            self.dictionary
+        )
+
+    def encode_lists(self, lists: pa.ListArray) -> pa.ListArray:
+        """Dictionary encode values of each list"""
+        offsets = pc.subtract(lists.offsets, lists.offsets[0])
+        return pa.ListArray.from_arrays(
+            offsets,
+            self.encode(lists.flatten()),
+            mask=lists.is_null()
+        )
+
+
+def read_partial_file(file_path: str) -> Iterator[pa.RecordBatch]:
+    """
+    Read record batches from partial file, last batch of the file
+    left by killed scraping may be incomplete, so it's skipped.
+    """
+    try:
+        with pa.OSFile(file_path) as source:
+            with pa.ipc.open_stream(source) as reader:
+                yield from reader
+    except (OSError, pa.ArrowInvalid) as error:
+        logger.warning(f"Partial file {file_path} is incomplete: {error}")
+
+
+def encode_batch(
+        batch: pa.RecordBatch,
+        encoders: dict[str, DictionaryEncoder]
+) -> pa.RecordBatch:
+    """Convert batch from partial file to 'VACANCIES_SCHEMA'"""
+    columns = []
+    for field in VACANCIES_SCHEMA:
+        column = batch.column(field.name)
+        if pa.types.is_list(field.type):
+            column = encoders[field.name].encode_lists(column)
+        elif pa.types.is_dictionary(field.type):
+            column = encoders[field.name].encode(column)
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, schema=VACANCIES_SCHEMA)
+
+
+def partial_file_number(partial_path: str) -> int:
+    """Number of partial file, partial file without number is the first"""
+    name = os.path.basename(partial_path)[:-len(PARTIAL_FILE_EXTENSION)]
+    _, _, number = name.partition(PARTIAL_FILE_NUMBER_SEPARATOR)
+    return int(number) if number.isdigit() else -1
+
+
+def feather_file_name(partial_path: str) -> str:
+    """Name of feather file partial file is converted to"""
+    name = os.path.basename(partial_path)[:-len(PARTIAL_FILE_EXTENSION)]
+    return name.partition(PARTIAL_FILE_NUMBER_SEPARATOR)[0] + ".feather"
+
+
+def partial_files(result_dir: str) -> dict[str, list[str]]:
+    """Partial files of each feather file in order they were written"""
+    files = defaultdict(list)
+    for partial_path in sorted(
+            glob.glob(os.path.join(result_dir, f"*{PARTIAL_FILE_EXTENSION}")),
+            key=partial_file_number
+    ):
+        files[feather_file_name(partial_path)].append(partial_path)
+    return files
+
+
+def finalize_partial_files(partial_paths: list[str], file_path: str) -> None:
+    """Convert partial files to one feather file batch by batch"""
+    encoders = defaultdict(DictionaryEncoder)
+    options = pa.ipc.IpcWriteOptions(
+        compression=COMPRESSION, emit_dictionary_deltas=True
+    )
+
+    with pa.ipc.new_file(file_path, VACANCIES_SCHEMA, options=options) as w:
+        for partial_path in partial_paths:
+            for batch in read_partial_file(partial_path):
+                w.write_batch(encode_batch(batch, encoders))
+    # partial files are removed only when all of them are converted
+    for partial_path in partial_paths:
+        os.remove(partial_path)
+
+
+def save_file_metadata(
+        file_name: str,
+        created_at: date,
+        cube_file_name: str
+) -> None:
+    """Save metadata about created scraping result in DB"""
+    result_metadata = ScrapingResultFileMetaData(
+        file_name=file_name,
+        created_at=created_at,
+        cube_file_name=cube_file_name
+    )
+    session.add(result_metadata)
+    session.commit()
+    session.close()
 
 
 class FeatherMySQLItemPipeline:
@@ -23,10 +160,45 @@ class FeatherMySQLItemPipeline:
     Item Pipeline for storing metedata in MySQL (like
      date of file creation, name of file etc.) and formating and storing
     result of scraping in format Feather.
+
+    Every 'batch_size' items are written to the partial Arrow stream
+    file, so memory does not grow with number of scraped items and
+    items are not lost if scraping is killed. Partial files left by
+    killed scraping are converted to feather files on the next run,
+    today's ones are converted together with partial file of this run.
     """
-    def __init__(self) -> None:
+    def __init__(self, batch_size: int = 500) -> None:
         self.items = []
+        self.batch_size = batch_size
         self.result_dir = os.getenv("SCRAPING_RESULT_DIR")
+        self.created_at = date.today()
+        self.partial_paths: list[str] = []
+        self.writer = None
+        self.signals = None
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        pipeline = cls(
+            batch_size=crawler.settings.getint("FEATHER_BATCH_SIZE")
+        )
+        pipeline.signals = crawler.signals
+        return pipeline
+
+    @property
+    def file_name(self) -> str:
+        return f"vacancies_{self.created_at.strftime(DATE_FORMAT)}.feather"
+
+    def new_partial_path(self, today_partial_paths: list[str]) -> str:
+        """Partial file of this run, numbered after today's partial files"""
+        number = max(map(partial_file_number, today_partial_paths), default=-1)
+        return os.path.join(
+            self.result_dir,
+            self.file_name.replace(
+                ".feather",
+                f"{PARTIAL_FILE_NUMBER_SEPARATOR}{number + 1}"
+                f"{PARTIAL_FILE_EXTENSION}"
+            )
+        )
 
     @staticmethod
     def serialize_item(item: Item) -> dict:
@@ -40,9 +212,60 @@ class FeatherMySQLItemPipeline:
             if field_name in item.fields
         }
 
+    def recover_partial_files(self) -> list[str]:
+        """
+        Convert partial files left by killed scraping to feather files,
+        return today's partial files, since they are going to be saved
+        in today's feather file.
+        """
+        today_partial_paths = []
+        for file_name, partial_paths in partial_files(
+                self.result_dir
+        ).items():
+            if file_name == self.file_name:
+                today_partial_paths = partial_paths
+                continue
+
+            logger.info(f"Recovering scraping result {file_name}")
+            file_path = os.path.join(self.result_dir, file_name)
+            finalize_partial_files(partial_paths, file_path)
+            write_skills_cube(
+                file_path,
+                os.path.join(self.result_dir, cube_file_name(file_name))
+            )
+            created_at = datetime.strptime(
+                file_name, f"vacancies_{DATE_FORMAT}.feather"
+            ).date()
+            save_file_metadata(
+                file_name, created_at, cube_file_name(file_name)
+            )
+            add_skill_aliases(file_skills(file_path))
+
+        return today_partial_paths
+
+    def open_spider(self, spider: Spider) -> None:
+        # today's partial files are kept as they are until this run is
+        # finished, so killed run does not lose them
+        self.partial_paths = self.recover_partial_files()
+        self.partial_paths.append(self.new_partial_path(self.partial_paths))
+
+        self.writer = pa.ipc.new_stream(self.partial_paths[-1], PARTIAL_SCHEMA)
+
+    def write_items(self) -> None:
+        if self.items:
+            self.writer.write_batch(
+                pa.RecordBatch.from_pylist(self.items, PARTIAL_SCHEMA)
+            )
+            self.items = []
+            if self.signals is not None:
+                self.signals.send_catch_log(signal=items_written)
+
     def process_item(self, item: Item, spider: Spider) -> Item:
         serialized_item = self.serialize_item(item)
         self.items.append(serialized_item)
+
+        if len(self.items) >= self.batch_size:
+            self.write_items()
         return item
 
     def close_spider(self, spider: Spider) -> None:
@@ -51,20 +274,22 @@ class FeatherMySQLItemPipeline:
         :param spider:
         :return:
         """
-        df = pd.DataFrame(self.items)
-
-        created_at = date.today().strftime('%Y_%m_%d')
-        file_name = f"vacancies_{created_at}.feather"
+        self.write_items()
+        self.writer.close()
 
         # saving scraped data in feather file, because I do not have
         # Cloud Storage where I could save files.
-        df.to_feather(path=os.path.join(self.result_dir, file_name))
+        file_path = os.path.join(self.result_dir, self.file_name)
+        finalize_partial_files(self.partial_paths, file_path)
+        # diagrams are made of skills cube instead of all scraped items
+        write_skills_cube(
+            file_path,
+            os.path.join(self.result_dir, cube_file_name(self.file_name))
+        )
 
-        # save metadata about created scraping result in DB
-        result_metadata = ScrapingResultFileMetaData(
-            file_name=file_name,
-            created_at=created_at
+        save_file_metadata(
+            self.file_name, self.created_at, cube_file_name(self.file_name)
         )
-        session.add(result_metadata)
-        session.commit()
-        session.close()
+        # map newly seen skills to canonical skills, so they are
+        # not matched when diagrams are made
+        add_skill_aliases(file_skills(file_path))
@@ -0,0 +1,45 @@
+"""
+Arrow schema of scraping result files, shared by scraping pipeline
+writing the files and analysis reading them
+"""
+import pyarrow as pa
+
+# items are written to partial file as plain strings and dictionary
+# encoded when partial file is converted to feather file
+PARTIAL_SCHEMA = pa.schema([
+    ("required_skills", pa.list_(pa.string())),
+    ("optional_skills", pa.list_(pa.string())),
+    ("os", pa.list_(pa.string())),
+    ("level_of_exp", pa.list_(pa.string())),
+    ("employment_type", pa.list_(pa.string())),
+    ("contracts", pa.list_(pa.string())),
+    ("location", pa.string()),
+    ("ua_support", pa.bool_()),
+])
+# low-cardinality strings are stored once in dictionary
+# and each row keeps only int32 index of the string
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+VACANCIES_SCHEMA = pa.schema([
+    ("required_skills", pa.list_(CATEGORY)),
+    ("optional_skills", pa.list_(CATEGORY)),
+    ("os", pa.list_(CATEGORY)),
+    ("level_of_exp", pa.list_(CATEGORY)),
+    ("employment_type", pa.list_(CATEGORY)),
+    ("contracts", pa.list_(CATEGORY)),
+    ("location", CATEGORY),
+    ("ua_support", pa.bool_()),
+])
+# skills cube counts vacancies and their skills grouped by all columns
+# diagrams are made of, so cubes of several files are merged by summing
+# counts. Rows without skill count vacancies: all of them for 'vacancies'
+# kind and only those listing skills of the kind for skills kinds.
+CUBE_SCHEMA = pa.schema([
+    ("kind", CATEGORY),
+    ("skill", CATEGORY),
+    ("level_of_exp", pa.list_(CATEGORY)),
+    ("employment_type", pa.list_(CATEGORY)),
+    ("contracts", pa.list_(CATEGORY)),
+    ("location", CATEGORY),
+    ("ua_support", pa.bool_()),
+    ("count", pa.int64()),
+])
@@ -52,12 +52,15 @@ DEFAULT_REQUEST_HEADERS = {
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 SPIDER_MIDDLEWARES = {
-    "scraping.middlewares.CacheUrlMiddleware": 544,
+    "scraping.middlewares.SeenVacancyMiddleware": 544,
+    # the closest to the spider, so driver is released right after callback
+    "scraping.middlewares.SeleniumDriverReleaseMiddleware": 999,
 }
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
+    "scraping.middlewares.SeenListingPagesMiddleware": 700,
     "scraping.middlewares.DownloadSeleniumMiddleware": 800
 }
 
@@ -72,6 +75,8 @@ DOWNLOADER_MIDDLEWARES = {
 ITEM_PIPELINES = {
    "scraping.pipelines.FeatherMySQLItemPipeline": 300,
 }
+# Number of scraped items written to the result file at once
+FEATHER_BATCH_SIZE = 500
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -113,6 +118,37 @@ SELENIUM_DRIVER_ARGUMENTS = [
 
 SELENIUM_DRIVER_EXECUTABLE_PATH = ""
 
+# Use the browser only for 'SeleniumRequest' (listing pages), vacancy
+# pages are downloaded by Scrapy downloader with fallback to the browser
+# if static HTML is missing 'VacancyScraper.static_page_selectors'
+SELENIUM_HYBRID_MODE = True
+
+# Number of Chrome instances loading pages in parallel threads
+SELENIUM_POOL_SIZE = 3
+# Restart driver after it loaded number of pages (0 - never)
+SELENIUM_DRIVER_MAX_PAGES = 100
+# Take back driver whose response did not reach the spider after seconds
+SELENIUM_DRIVER_LEASE_SECONDS = 300
+
+# Scrape again vacancies which were not seen for number of days (0 - never)
+SEEN_VACANCIES_EXPIRE_DAYS = 0
+
+# Ways of getting skills from vacancy description: "heuristic" - finding
+# capitalized words, "dictionary" - finding skills from vocabulary, it is
+# optional, since it changes skills saved in scraping results
+SKILLS_EXTRACTORS = ["heuristic"]
+# Number of worker processes getting skills from vacancy description,
+# so it does not block downloading (0 - get skills in spider process).
+# Spider run by Celery prefork worker is in daemonic process, which can
+# not start them, so there skills are got in spider process anyway
+SKILLS_EXTRACTION_PROCESSES = 0
+
+# Number of vacancies kept in cache with content hash of vacancy page,
+# so unchanged vacancies are not extracted again (0 - disabled).
+# Seen vacancies are not downloaded at all, so cache is used only for
+# vacancies scraped again after SEEN_VACANCIES_EXPIRE_DAYS
+VACANCY_ITEM_CACHE_SIZE = 0
+
 LOG_LEVEL = "INFO"
 
 # Optionally suppress logs from specific libraries
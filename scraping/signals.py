@@ -0,0 +1,7 @@
+"""
+Signals of the project sent between pipelines and middlewares
+"""
+
+# batch of scraped items is written to partial file of scraping result,
+# so vacancies of the items are not scraped again if scraping is killed
+items_written = object()
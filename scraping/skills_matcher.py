@@ -0,0 +1,240 @@
+"""
+Dictionary skills matcher, finds skills from vocabulary in requirements
+text using Aho-Corasick automaton, so all skills are found in one pass
+over the text.
+"""
+import os
+import glob
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+import dotenv
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
+
+dotenv.load_dotenv()
+logger = logging.getLogger(__name__)
+
+# curated skills vocabulary, canonical skill name and its aliases
+SKILLS_ALIASES = {
+    "Python": ["Python", "Python3", "Python 3"],
+    "Django": ["Django"],
+    "Django REST Framework": ["Django REST Framework", "DRF"],
+    "Flask": ["Flask"],
+    "FastAPI": ["FastAPI", "Fast API"],
+    "PostgreSQL": ["PostgreSQL", "Postgres", "Postgre", "psql"],
+    "MySQL": ["MySQL"],
+    "MongoDB": ["MongoDB", "Mongo"],
+    "Redis": ["Redis"],
+    "SQL": ["SQL"],
+    "NoSQL": ["NoSQL"],
+    "JavaScript": ["JavaScript", "JS"],
+    "TypeScript": ["TypeScript", "TS"],
+    "React": ["React", "React.js", "ReactJS"],
+    "Docker": ["Docker"],
+    "Kubernetes": ["Kubernetes", "k8s"],
+    "AWS": ["AWS", "Amazon Web Services"],
+    "Azure": ["Azure", "Microsoft Azure"],
+    "GCP": ["GCP", "Google Cloud", "Google Cloud Platform"],
+    "Git": ["Git"],
+    "Linux": ["Linux"],
+    "CI/CD": ["CI/CD", "CICD"],
+    "REST": ["REST", "REST API", "RESTful"],
+    "Celery": ["Celery"],
+    "RabbitMQ": ["RabbitMQ", "Rabbit MQ"],
+    "Kafka": ["Kafka", "Apache Kafka"],
+    "Pandas": ["Pandas"],
+    "NumPy": ["NumPy"],
+    "Machine Learning": ["Machine Learning", "ML"],
+    "Go": ["Go", "Golang"],
+    "Java": ["Java"],
+    "C#": ["C#"],
+    "C++": ["C++"],
+    ".NET": [".NET"],
+    "Terraform": ["Terraform"],
+    "English": ["English"],
+}
+# aliases this short are matched only with the same case, ex. 'Go', 'ML'
+CASE_SENSITIVE_LENGTH = 3
+# skills from earlier scraping results are added to vocabulary only
+# if they were seen at least this number of times
+MIN_SEEN_COUNT = 3
+SKILLS_COLUMNS = ("required_skills", "optional_skills")
+
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton matching all 'patterns' in one pass"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        # trie transitions, failure links and patterns ending in each node
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[str]] = [[]]
+
+        for pattern in patterns:
+            self.add(pattern)
+        self.build_failure_links()
+
+    def add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.output[node].append(pattern)
+
+    def build_failure_links(self) -> None:
+        # breadth-first, so failure node is always built before
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output[child] += self.output[self.fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, str]]:
+        """Yield (end position, pattern) of all patterns found in text"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+
+            for pattern in self.output[node]:
+                yield position + 1, pattern
+
+
+def lowered(text: str) -> tuple[str, Optional[list[int]]]:
+    """
+    Lowercase text and position in text of each character of lowercase
+    text, or None if they are the same, since a few characters (e.g.
+    'İ') become longer in lowercase
+    """
+    lower_text = text.lower()
+    if len(lower_text) == len(text):
+        return lower_text, None
+
+    positions = []
+    for position, char in enumerate(text):
+        positions.extend([position] * len(char.lower()))
+    return lower_text, positions
+
+
+class SkillsMatcher:
+    """
+    Find skills from vocabulary in texts and return their canonical
+    names. Aliases are matched as whole words, case-insensitive except
+    short ones.
+    """
+
+    def __init__(self, aliases: dict[str, list[str]]) -> None:
+        # lowercase alias -> (alias, canonical skill name)
+        self.aliases = {
+            alias.lower(): (alias, skill)
+            for skill, skill_aliases in aliases.items()
+            for alias in skill_aliases
+        }
+        self.automaton = AhoCorasick(self.aliases)
+
+    def match_text(self, text: str) -> set[str]:
+        skills = set()
+        lower_text, positions = lowered(text)
+
+        for end, pattern in self.automaton.iter_matches(lower_text):
+            start = end - len(pattern)
+            if positions is not None:
+                # match has to start and end on whole characters of text
+                if (
+                        start > 0 and positions[start - 1] == positions[start]
+                        or end < len(positions)
+                        and positions[end] == positions[end - 1]
+                ):
+                    continue
+                start, end = positions[start], positions[end - 1] + 1
+            alias, skill = self.aliases[pattern]
+
+            # match only whole words
+            if (
+                    start > 0 and is_word_char(text[start - 1])
+                    or end < len(text) and is_word_char(text[end])
+            ):
+                continue
+            if (
+                    len(alias) < CASE_SENSITIVE_LENGTH
+                    and text[start:end] != alias
+            ):
+                continue
+            skills.add(skill)
+
+        return skills
+
+    def match(self, texts: list[str]) -> list[set[str]]:
+        """Get canonical skills found in each of the texts"""
+        return [self.match_text(text) for text in texts]
+
+
+def seen_skills(file_paths: Iterable[str]) -> set[str]:
+    """Skills seen at least 'MIN_SEEN_COUNT' times in scraping results"""
+    counts = Counter()
+
+    for file_path in file_paths:
+        # only skills columns are read from memory-mapped file
+        table = feather.read_table(
+            file_path, columns=list(SKILLS_COLUMNS), memory_map=True
+        )
+        for column in table.columns:
+            # older files have null column, when no vacancy had skills
+            skills = pc.list_flatten(column.cast(pa.list_(pa.string())))
+            skills_counts = pc.value_counts(skills.drop_null())
+            counts.update(dict(zip(
+                skills_counts.field("values").to_pylist(),
+                skills_counts.field("counts").to_pylist()
+            )))
+
+    return {
+        skill for skill, count in counts.items() if count >= MIN_SEEN_COUNT
+    }
+
+
+def skills_vocabulary(result_dir: str) -> dict[str, list[str]]:
+    """
+    Curated skills vocabulary, grown with skills seen in earlier
+    scraping results saved in 'result_dir'
+    """
+    vocabulary = {
+        skill: list(aliases) for skill, aliases in SKILLS_ALIASES.items()
+    }
+    known_aliases = {
+        alias.lower() for aliases in vocabulary.values() for alias in aliases
+    }
+
+    file_paths = glob.glob(os.path.join(result_dir, "vacancies_*.feather"))
+    for skill in seen_skills(file_paths):
+        if skill.lower() not in known_aliases:
+            vocabulary[skill] = [skill]
+            known_aliases.add(skill.lower())
+
+    logger.info("Skills vocabulary has %s skills", len(vocabulary))
+    return vocabulary
+
+
+@lru_cache(maxsize=None)
+def get_skills_matcher() -> SkillsMatcher:
+    """Skills matcher shared by whole process"""
+    return SkillsMatcher(
+        skills_vocabulary(os.getenv("SCRAPING_RESULT_DIR", ""))
+    )
@@ -0,0 +1,94 @@
+"""
+Getting skills from vacancy descriptions in a process pool, so CPU bound
+extraction does not block Scrapy reactor and runs on all cores.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from twisted.internet.defer import Deferred, succeed
+from w3lib.html import remove_tags
+
+from scraping.items import get_skills_extractor
+from scraping.skills_matcher import get_skills_matcher
+
+logger = logging.getLogger(__name__)
+
+HEURISTIC = "heuristic"
+DICTIONARY = "dictionary"
+
+
+def warm_up(extractors: list[str]) -> None:
+    """Load stopwords and build vocabulary once, when worker starts"""
+    if HEURISTIC in extractors:
+        get_skills_extractor()
+    if DICTIONARY in extractors:
+        get_skills_matcher()
+
+
+def description_skills(
+        descriptions: list[list[str]],
+        extractors: list[str]
+) -> list[set[str]]:
+    """
+    Getting skills out of each of descriptions, which may not be
+    in 'REQ_EXPECTED', 'REQ_OPTIONAL' tags.
+    """
+    result = []
+    for desc in descriptions:
+        skills = set()
+        if HEURISTIC in extractors:
+            skills |= set().union(*get_skills_extractor().extract(desc))
+        if DICTIONARY in extractors:
+            # description may be HTML, aliases are matched only in its text
+            skills |= set().union(*get_skills_matcher().match(
+                [remove_tags(text) for text in desc]
+            ))
+        result.append(skills)
+    return result
+
+
+class SkillsExtractionPool:
+    """
+    Pool of warm worker processes extracting skills, results are returned
+    as Deferred. With 0 'processes' skills are extracted in the current
+    process, but still returned as Deferred. Daemonic process (e.g. child
+    of Celery prefork worker) can not start processes, so skills are
+    extracted in it too.
+    """
+    def __init__(self, processes: int, extractors: list[str]) -> None:
+        self.extractors = extractors
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+        if processes and multiprocessing.current_process().daemon:
+            logger.warning(
+                "Skills are extracted in spider process, since daemonic "
+                "process can not start %s extraction processes",
+                processes
+            )
+            processes = 0
+
+        if processes:
+            self.executor = ProcessPoolExecutor(
+                max_workers=processes,
+                # do not fork process with running reactor and browsers
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+                initargs=(extractors,)
+            )
+
+    def extract(self, descriptions: list[list[str]]) -> Deferred:
+        """Get skills from each of descriptions"""
+        if self.executor is None:
+            return succeed(description_skills(descriptions, self.extractors))
+
+        future = self.executor.submit(
+            description_skills, descriptions, self.extractors
+        )
+        return Deferred.fromFuture(asyncio.wrap_future(future))
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
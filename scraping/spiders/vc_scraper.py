@@ -1,21 +1,29 @@
 """
 Vacancy scraper module
 """
+import os
+import hashlib
 from tqdm import tqdm
-from typing import Any, Iterable
+from typing import Any, Iterable, Optional
 
 import scrapy
+from scrapy import signals
 from scrapy.http.response.html import HtmlResponse
 from scrapy.selector import Selector
+from scrapy.utils.defer import maybe_deferred_to_future
 from scrapy_selenium4 import SeleniumRequest
 from selenium.webdriver.common.by import By
 from selenium.webdriver import Chrome
 
 import config
-from scraping.items import VacancyItem, VacancySkills
+from scraping.items import VacancyItem
+from scraping.item_cache import VacancyItemCache
+from scraping.skills_pool import HEURISTIC, SkillsExtractionPool
 
 
 # CSS selector path to element(s)
+# containers with skill labels: required, optional, os
+SKILLS_CONTAINER = ".c1fj2x2p"
 SKILLS = ".l1sjc53z::text"
 CONTRACTS_SALARY = "p[data-test='text-contractName']::text"
 
@@ -45,45 +53,121 @@ LAST_PAGE_NUM = "nav ul li:nth-last-child(2) a"
 class VacancyScraper(scrapy.Spider):
     name = "vacancies"
     start_urls = [config.JOB_URL]
-    page_num = 1
-    # last pagination button
-    last_page_num = 0
+    # elements 'parse_vc' needs in vacancy page downloaded without
+    # the browser, otherwise the page is downloaded again by the browser
+    static_page_selectors = (REQUIREMENTS, SKILLS)
+
+    # the first listing page without unseen vacancies, pages after it
+    # are not scraped, it is set by 'SeenVacancyMiddleware'
+    seen_page_num: Optional[int] = None
+    item_cache: Optional[VacancyItemCache] = None
+    skills_pool: Optional[SkillsExtractionPool] = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+
+        spider.skills_pool = SkillsExtractionPool(
+            processes=crawler.settings.getint("SKILLS_EXTRACTION_PROCESSES"),
+            extractors=spider.skills_extractors
+        )
+        crawler.signals.connect(
+            spider.skills_pool.close, signal=signals.spider_closed
+        )
+
+        cache_size = crawler.settings.getint("VACANCY_ITEM_CACHE_SIZE")
+        if cache_size and not crawler.settings.getint(
+                "SEEN_VACANCIES_EXPIRE_DAYS"
+        ):
+            spider.logger.warning(
+                "Vacancy item cache is never used, since seen vacancies "
+                "are not scraped again, set SEEN_VACANCIES_EXPIRE_DAYS"
+            )
+        if cache_size:
+            spider.item_cache = VacancyItemCache(
+                path=os.getenv(
+                    "VACANCY_ITEM_CACHE_FILE", "vacancy_items.sqlite3"
+                ),
+                max_size=cache_size
+            )
+            crawler.signals.connect(
+                spider.item_cache.close, signal=signals.spider_closed
+            )
+        return spider
 
     def start_requests(self) -> Iterable[SeleniumRequest]:
         for url in self.start_urls:
-            yield SeleniumRequest(url=url, callback=self.parse, wait_time=10)
+            yield SeleniumRequest(
+                url=url,
+                callback=self.parse,
+                wait_time=10,
+                meta={"page_num": 1}
+            )
 
     def parse(self, response: HtmlResponse, **kwargs: Any) -> VacancyItem:
         # get vacancies
         for vc in tqdm(response.css(".o1onjy6t .a4pzt2q")):
             yield response.follow(vc, callback=self.parse_vc)
 
-        self.page_num += 1
+        if response.meta["page_num"] != 1:
+            return
 
         # get last pagination number at the beginning
         # because later we would not be able to get it
-        if not self.last_page_num:
-
-            driver: Chrome = response.meta["driver"]
-            # get last pagination button which we will save
-            # to move forward since we can not move one by one
-            # pagination buttons
-            last_page_number = driver.find_element(By.XPATH, LAST_PAGE_NUM)
-            self.last_page_num = int(
-                last_page_number.get_attribute("innerHTML")
-            )
-
-        # checking if we are not going over self.last_page_num
-        if self.page_num < self.last_page_num:
+        last_page_num = self.get_last_page_num(response)
+        # all listing pages are scheduled at once, so failed page does not
+        # stop the next ones. Earlier pages go first and number of pages
+        # loaded at the same time is limited by 'SELENIUM_POOL_SIZE'
+        for next_page_num in range(2, last_page_num + 1):
             yield SeleniumRequest(
-                url=response.urljoin(f"?pageNumber={self.page_num}"),
-                callback=self.parse
+                url=response.urljoin(f"?pageNumber={next_page_num}"),
+                callback=self.parse,
+                priority=-next_page_num,
+                meta={"page_num": next_page_num}
             )
 
-    def parse_vc(self, vc: HtmlResponse, **kwargs) -> VacancyItem:
+    @staticmethod
+    def get_last_page_num(response: HtmlResponse) -> int:
+        """Get number of the last pagination button"""
+        driver: Chrome = response.meta["driver"]
+        # get last pagination button which we will save
+        # to move forward since we can not move one by one
+        # pagination buttons
+        last_page_number = driver.find_element(By.XPATH, LAST_PAGE_NUM)
+        return int(last_page_number.get_attribute("innerHTML"))
+
+    async def parse_vc(self, vc: HtmlResponse, **kwargs) -> VacancyItem:
+        if self.item_cache is None:
+            return await self.extract_vc(vc)
+
+        content_hash = self.content_hash(vc)
+        item = self.item_cache.get(vc.url, content_hash)
+
+        if item is not None:
+            self.crawler.stats.inc_value("vacancy_cache/hit", spider=self)
+            return item
+
+        self.crawler.stats.inc_value("vacancy_cache/miss", spider=self)
+        item = await self.extract_vc(vc)
+        self.item_cache.set(vc.url, content_hash, item)
+        return item
+
+    @staticmethod
+    def content_hash(vc: HtmlResponse) -> str:
+        """Hash of vacancy page parts which items are extracted from"""
+        content = hashlib.sha1()
+        for selector in (
+                REQUIREMENTS, SKILLS_CONTAINER, VC_INFO, CONTRACTS_SALARY
+        ):
+            for fragment in vc.css(selector).getall():
+                content.update(fragment.encode())
+        return content.hexdigest()
+
+    async def extract_vc(self, vc: HtmlResponse) -> VacancyItem:
+        """Extract vacancy information and skills from vacancy page"""
 
         # get all containers with skill labels
-        skills = vc.css(".c1fj2x2p")
+        skills = vc.css(SKILLS_CONTAINER)
         # Ensure the list has exactly 3 elements, filling with '[]' if fewer
         skills = (skills + [[]] * 3)[:3]
         required_skills, optional_skills, os = \
@@ -101,15 +185,23 @@ class VacancyScraper(scrapy.Spider):
         # as 'req_required' and 'req_optional'
         req_required = req_required if req_required else requirements.getall()
 
+        # getting skills from description may be done by other process,
+        # so meanwhile reactor keeps downloading
+        req_required_skills, req_optional_skills = (
+            await maybe_deferred_to_future(
+                self.skills_pool.extract([req_required, req_optional])
+            )
+        )
+
         # vacancy information
         return VacancyItem(
             **{
-                "required_skills": self.description_skills(
-                    req_required
-                ).union(set(required_skills)),
-                "optional_skills": self.description_skills(
-                    req_optional
-                ).union(set(optional_skills)),
+                "required_skills": req_required_skills.union(
+                    set(required_skills)
+                ),
+                "optional_skills": req_optional_skills.union(
+                    set(optional_skills)
+                ),
                 "os": os,
                 "level_of_exp": vc.css(LEVEL_OF_EXP).xpath(
                     ANCESTOR_TEXT).get(),
@@ -121,13 +213,13 @@ class VacancyScraper(scrapy.Spider):
             }
         )
 
-    @staticmethod
-    def description_skills(desc: list[str]) -> set[str]:
+    @property
+    def skills_extractors(self) -> list[str]:
         """
-        Getting additional skills out of description that may not be
-        in 'REQ_EXPECTED', 'REQ_OPTIONAL' tags.
+        Ways of getting skills from description: 'heuristic' - capitalized
+        words, 'dictionary' - skills from vocabulary
         """
-        return VacancySkills(texts=desc).get_clean_skills()
+        return self.settings.getlist("SKILLS_EXTRACTORS", [HEURISTIC])
 
     @staticmethod
     def get_required_requirements(requirements: Selector) -> list[str]:
@@ -0,0 +1,6 @@
+import os
+
+# modules of the project connect to database when it is used only, so
+# tests import them with any database url
+os.environ.setdefault("DATABASE_URL", "sqlite:///tests.db")
+os.environ.setdefault("SCRAPING_RESULT_DIR", "scraping_results")
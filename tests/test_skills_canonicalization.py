@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from analyzing.skills_canonicalization import canonical_skills
+from benchmarks.skills_canonicalization import (
+    make_skills_counts,
+    previous_removing_duplicates
+)
+
+PARITY_CASES = 10
+PARITY_SKILLS = 300
+
+
+@pytest.mark.parametrize("counts", [
+    {"AI": 5, "AI services": 3},
+    {"Python": 10, "python3": 4, "Python 3": 2, "Pyton": 1},
+    {"React": 7, "ReactJS": 3, "React.js": 2, "Redux": 5},
+    {"Go": 3, "Golang": 2, "Google Cloud": 1},
+])
+def test_canonical_skills_of_variants(counts):
+    counts = pd.Series(counts).sort_values(ascending=False)
+
+    assert list(canonical_skills(counts).items()) == list(
+        previous_removing_duplicates(counts).items()
+    )
+
+
+@pytest.mark.parametrize("seed", range(PARITY_CASES))
+def test_canonical_skills_parity(seed):
+    counts = make_skills_counts(PARITY_SKILLS, seed)
+
+    assert list(canonical_skills(counts).items()) == list(
+        previous_removing_duplicates(counts).items()
+    )
@@ -0,0 +1,44 @@
+import pyarrow as pa
+
+from analyzing.skills_cube import skills_cube
+from scraping.schema import CUBE_SCHEMA, PARTIAL_SCHEMA, VACANCIES_SCHEMA
+
+
+def test_skills_cube_of_empty_table():
+    cube = skills_cube(VACANCIES_SCHEMA.empty_table())
+
+    assert cube.schema == CUBE_SCHEMA
+    assert cube.num_rows == 0
+
+
+def test_skills_cube_counts_vacancies_and_skills():
+    table = pa.Table.from_pylist([
+        {
+            "required_skills": ["Python", "SQL"],
+            "optional_skills": None,
+            "level_of_exp": ["Middle"],
+            "location": "Kyiv",
+            "ua_support": True,
+        },
+        {
+            "required_skills": ["Python"],
+            "optional_skills": ["Docker"],
+            "level_of_exp": ["Middle"],
+            "location": "Kyiv",
+            "ua_support": True,
+        },
+    ], schema=PARTIAL_SCHEMA)
+
+    counts = {
+        (row["kind"], row["skill"]): row["count"]
+        for row in skills_cube(table).to_pylist()
+    }
+
+    assert counts == {
+        ("vacancies", None): 2,
+        ("required_skills", None): 2,
+        ("required_skills", "Python"): 2,
+        ("required_skills", "SQL"): 1,
+        ("optional_skills", None): 1,
+        ("optional_skills", "Docker"): 1,
+    }
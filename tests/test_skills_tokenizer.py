@@ -0,0 +1,76 @@
+import random
+import time
+
+import pytest
+
+from scraping.items import find_capitalized_phrases, skills_pattern
+
+RANDOM_TEXTS = 20000
+# pieces random texts are made of, tricky for tokenizer: digits, polish
+# letters, ':', '-', '.' and words of one or two letters
+PIECES = (
+    "Ab", "A", "REST", "Python3", "py", "Łódź", "Kraków", " ", " ", " ",
+    ":", "-", ".", ",", "/", "\n", "_", "x", "Go", "é", "2",
+)
+WORDS = (
+    "Python", "Django", "REST Framework", "PostgreSQL", "Docker", "AWS",
+    "experience", "with", "and", "the", "Knowledge", "of", "Team", "is",
+    "good", "Kubernetes", "CI/CD", "Linux", "English", "Skills:", "Redis",
+)
+# tokenizer is linear, so it has to be fast where regex backtracks
+PATHOLOGICAL_SIZE = 5000
+PATHOLOGICAL_SECONDS = 1
+
+
+def random_texts(pieces: tuple, count: int, max_size: int) -> list[str]:
+    rnd = random.Random(0)
+    return [
+        "".join(rnd.choices(pieces, k=rnd.randint(0, max_size)))
+        for _ in range(count)
+    ]
+
+
+def pathological_texts(size: int) -> list[str]:
+    return [
+        "x " + "Word " * size + "Word:",
+        "x " + "Ab " * size + "Ab:",
+        "x " + "Ab" * size + "1 ",
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Python",
+    "Python, Django and REST Framework",
+    "Requirements: Python Django",
+    "Nice To Have Skills: Docker",
+    "-Python .Django Flask",
+    "Python3 Go2 AWS",
+    "Łódź Kraków Warszawa",
+    "CI/CD GitHub Actions:",
+    "A B C D:",
+])
+def test_tricky_texts(text):
+    assert find_capitalized_phrases(text) == skills_pattern().findall(text)
+
+
+def test_random_texts():
+    pattern = skills_pattern()
+    texts = (
+        random_texts(PIECES, RANDOM_TEXTS, 20)
+        + random_texts(tuple(f"{word} " for word in WORDS), 1000, 30)
+    )
+    for text in texts:
+        assert find_capitalized_phrases(text) == pattern.findall(text), text
+
+
+@pytest.mark.parametrize("text", pathological_texts(20))
+def test_pathological_texts(text):
+    assert find_capitalized_phrases(text) == skills_pattern().findall(text)
+
+
+@pytest.mark.parametrize("text", pathological_texts(PATHOLOGICAL_SIZE))
+def test_pathological_texts_time(text):
+    start = time.perf_counter()
+    find_capitalized_phrases(text)
+    assert time.perf_counter() - start < PATHOLOGICAL_SECONDS
@@ -0,0 +1,264 @@
+"""
+Cache of rendered diagrams shared by web server and Celery workers, so
+diagrams of the same scraping result files are not made again. Diagram
+is written once to 'DIAGRAMS_DIR' as PNG, WebP or JSON file named by hash of
+its inputs, which are files set, diagram name and format, and the
+directory is served by nginx. Id of files set is made of metadata of the files.
+
+Sizes of files and time they were used last are kept in Redis, least
+recently used files are removed when they take more than
+'DIAGRAMS_CACHE_MAX_BYTES'. Redis may be shared with Celery broker, so
+it keeps only names of files and not diagrams.
+
+Files of set and diagrams being made are kept in Redis too, so diagram
+requested again before it is cached waits for the running task instead
+of making it again. Running task key expires, so it does not block the
+diagram if worker dies. Failed diagram is marked for a short time, so
+polling it does not make it again and again, until it is retried.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from contextlib import suppress
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+import dotenv
+import redis
+
+dotenv.load_dotenv()
+logger = logging.getLogger(__name__)
+
+# diagrams files are served from there by nginx
+DIAGRAMS_DIR = os.getenv("DIAGRAMS_DIR", "static/diagrams")
+KEY_PREFIX = "diagrams:"
+# sorted set of diagrams files scored by time they were used last
+LRU_KEY = KEY_PREFIX + "lru"
+# hash of size in bytes of each diagram file
+SIZES_KEY = KEY_PREFIX + "sizes"
+MAX_BYTES = int(os.getenv("DIAGRAMS_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+# files set is kept that long after it was selected last time
+FILES_KEY_SECONDS = 24 * 60 * 60
+# diagram is made by another task when running task takes longer
+TASK_KEY_SECONDS = int(os.getenv("DIAGRAMS_TASK_KEY_SECONDS", 600))
+# failed diagram is made again only when it is retried in that time
+FAILED_KEY_SECONDS = int(os.getenv("DIAGRAMS_FAILED_KEY_SECONDS", 300))
+# delete running task key only if it is still key of the task
+RELEASE_TASK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+# code diagrams are made by, cached diagrams of other code are not used
+ANALYSIS_SOURCES = ("analyzing", "web_server/tasks.py", "config.py")
+# settings diagrams are rendered with and their defaults, cached diagrams
+# rendered with other settings are not used either
+RENDER_SETTINGS = {"DIAGRAMS_DPI": "100"}
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+@lru_cache(maxsize=None)
+def analysis_version() -> str:
+    """Hash of source code and settings diagrams are made by"""
+    digest = hashlib.sha256()
+    for source in ANALYSIS_SOURCES:
+        path = ROOT_DIR / source
+        for file_path in sorted(path.rglob("*.py")) if path.is_dir() else [
+            path
+        ]:
+            digest.update(file_path.read_bytes())
+    for name, default in sorted(RENDER_SETTINGS.items()):
+        digest.update(f"{name}={os.getenv(name, default)}".encode())
+    return digest.hexdigest()
+
+
+def diagrams_set_id(files_metadata: Iterable[tuple]) -> str:
+    """
+    Id of files set, made of metadata rows of the files and version of
+    analysis code and settings, so id changes when any of them changes
+    """
+    rows = sorted(json.dumps(list(row), default=str) for row in files_metadata)
+    digest = hashlib.sha256(analysis_version().encode())
+    for row in rows:
+        digest.update(row.encode())
+    return digest.hexdigest()
+
+
+def diagram_file_name(
+        set_id: str, diagram_name: str, extension: str
+) -> str:
+    """Name of diagram file, which is hash of the diagram inputs"""
+    digest = hashlib.sha256(f"{set_id}:{diagram_name}".encode())
+    return f"{digest.hexdigest()}.{extension}"
+
+
+def files_key(set_id: str) -> str:
+    return KEY_PREFIX + set_id + ":files"
+
+
+def task_key(set_id: str, diagram_name: str, extension: str) -> str:
+    return f"{KEY_PREFIX}{set_id}:{diagram_name}.{extension}:task"
+
+
+def failed_key(set_id: str, diagram_name: str, extension: str) -> str:
+    return f"{KEY_PREFIX}{set_id}:{diagram_name}.{extension}:failed"
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis:
+    return redis.Redis.from_url(
+        os.getenv("DIAGRAMS_CACHE_URL", os.getenv("CELERY_RESULT_BACKEND")),
+        decode_responses=True
+    )
+
+
+def save_diagrams_files(set_id: str, file_paths: list[str]) -> None:
+    try:
+        get_redis().set(
+            files_key(set_id), json.dumps(file_paths), ex=FILES_KEY_SECONDS
+        )
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+
+
+def get_diagrams_files(set_id: str) -> Optional[list[str]]:
+    """Files of set or None, if set is unknown or expired"""
+    try:
+        file_paths = get_redis().get(files_key(set_id))
+        if file_paths is not None:
+            return json.loads(file_paths)
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+    return None
+
+
+def get_cached_diagram(
+        set_id: str, diagram_name: str, extension: str
+) -> Optional[str]:
+    """Name of diagram file or None, if diagram is not made yet"""
+    file_name = diagram_file_name(set_id, diagram_name, extension)
+    if not os.path.isfile(os.path.join(DIAGRAMS_DIR, file_name)):
+        return None
+
+    try:
+        get_redis().zadd(LRU_KEY, {file_name: time.time()})
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+    return file_name
+
+
+def evict(client: redis.Redis) -> None:
+    """Remove least recently used diagrams files over 'MAX_BYTES'"""
+    sizes = {
+        file_name: int(size)
+        for file_name, size in client.hgetall(SIZES_KEY).items()
+    }
+    total_size = sum(sizes.values())
+
+    for file_name in client.zrange(LRU_KEY, 0, -1):
+        if total_size <= MAX_BYTES:
+            break
+        total_size -= sizes.get(file_name, 0)
+        client.pipeline().zrem(LRU_KEY, file_name).hdel(
+            SIZES_KEY, file_name
+        ).execute()
+        with suppress(FileNotFoundError):
+            os.remove(os.path.join(DIAGRAMS_DIR, file_name))
+
+
+def cache_diagram(
+        set_id: str, diagram_name: str, extension: str, diagram: bytes
+) -> str:
+    """Write diagram file and return its name"""
+    file_name = diagram_file_name(set_id, diagram_name, extension)
+    file_path = os.path.join(DIAGRAMS_DIR, file_name)
+
+    # written under temporary name, so file is never served partially
+    os.makedirs(DIAGRAMS_DIR, exist_ok=True)
+    temp_file_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_file_path, "wb") as file:
+        file.write(diagram)
+    os.replace(temp_file_path, file_path)
+
+    try:
+        client = get_redis()
+        # the same diagram may be written again, its size is counted once
+        added, _ = client.pipeline().hset(
+            SIZES_KEY, file_name, len(diagram)
+        ).zadd(LRU_KEY, {file_name: time.time()}).execute()
+        if added:
+            evict(client)
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+    return file_name
+
+
+def running_diagram_task(
+        set_id: str, diagram_name: str, extension: str, task_id: str
+) -> str:
+    """
+    Id of task making diagram file of files set. If no task makes it,
+    'task_id' is saved as running task and returned.
+    """
+    try:
+        client = get_redis()
+        key = task_key(set_id, diagram_name, extension)
+        if client.set(key, task_id, nx=True, ex=TASK_KEY_SECONDS):
+            return task_id
+        return client.get(key) or task_id
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+    return task_id
+
+
+def release_diagram_task(
+        set_id: str, diagram_name: str, extension: str, task_id: str
+) -> None:
+    """Remove running task of diagram file, when task is finished"""
+    try:
+        get_redis().eval(
+            RELEASE_TASK_SCRIPT,
+            1,
+            task_key(set_id, diagram_name, extension),
+            task_id
+        )
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+
+
+def mark_diagram_failed(
+        set_id: str, diagram_name: str, extension: str
+) -> None:
+    """Mark diagram as failed, before its running task is removed"""
+    try:
+        get_redis().set(
+            failed_key(set_id, diagram_name, extension),
+            1,
+            ex=FAILED_KEY_SECONDS
+        )
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+
+
+def diagram_failed(set_id: str, diagram_name: str, extension: str) -> bool:
+    try:
+        return bool(get_redis().exists(
+            failed_key(set_id, diagram_name, extension)
+        ))
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
+    return False
+
+
+def forget_diagram_failure(
+        set_id: str, diagram_name: str, extension: str
+) -> None:
+    """Remove failed mark, so diagram is made again"""
+    try:
+        get_redis().delete(failed_key(set_id, diagram_name, extension))
+    except redis.RedisError as error:
+        logger.warning(f"Diagrams cache is not available: {error}")
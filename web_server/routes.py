@@ -1,23 +1,49 @@
+import os
+import uuid
 from datetime import datetime
 from flask import (
     Blueprint,
     request,
     g,
     render_template,
-    session
+    session,
+    abort,
+    redirect,
+    send_from_directory,
+    url_for
 )
 from sqlalchemy.orm import Query
-from sqlalchemy import select
+from sqlalchemy import select, func
 from celery.result import AsyncResult
 
 from main_celery.celery import celery_app
 from db.models import ScrapingResultFileMetaData
 from web_server.forms import ScrapingDataQueryFilter
 from web_server.config import Config
+from web_server.diagrams_cache import (
+    DIAGRAMS_DIR,
+    diagram_failed,
+    diagrams_set_id,
+    forget_diagram_failure,
+    get_cached_diagram,
+    get_diagrams_files,
+    release_diagram_task,
+    running_diagram_task,
+    save_diagrams_files
+)
+from web_server.tasks import DIAGRAMS
 
 
 diagrams = Blueprint("diagrams", __name__)
 DATE_TIME_FORMAT = "%a, %d %b %Y %H:%M:%S %Z"
+# diagram which is being made is requested again after that time
+DIAGRAM_RETRY_SECONDS = 1
+DIAGRAM_FAILED_RESPONSE = (
+    "Diagram could not be made", 500, {"Cache-Control": "no-store"}
+)
+# diagrams files are served there, by nginx when app is behind it
+DIAGRAMS_URL = "/diagrams/"
+DIAGRAM_MAX_AGE_SECONDS = 365 * 24 * 60 * 60
 
 
 def get_file_names_from_cache() -> None | list:
@@ -96,24 +122,37 @@ def get_diagrams():
         session["scrp_from_date"] = scraping_data_form.from_date.data
         session["scrp_file_names"] = scraping_data_form.files_name.data
 
-        scraping_metadata = select(ScrapingResultFileMetaData.file_path)
+        # diagrams are made of skills cubes, files saved without them
+        # are aggregated when read
+        scraping_metadata = select(
+            func.coalesce(
+                ScrapingResultFileMetaData.cube_file_path,
+                ScrapingResultFileMetaData.file_path
+            ),
+            # diagrams are cached by files metadata, so they are made
+            # again when metadata of any file changes
+            ScrapingResultFileMetaData.id,
+            ScrapingResultFileMetaData.file_name,
+            ScrapingResultFileMetaData.cube_file_name,
+            ScrapingResultFileMetaData.created_at,
+        )
         queryset = diagrams_query_filtering(
             queryset=scraping_metadata,
             query_form=scraping_data_form
         )
-        scraping_files_path = g.db.scalars(queryset).all()
+        scraping_files_metadata = g.db.execute(queryset).all()
+        scraping_files_path = [row[0] for row in scraping_files_metadata]
 
         if scraping_files_path:
-            diagrams_task_id = celery_app.send_task(
-                "web_server.tasks.get_diagrams_img",
-                args=[scraping_files_path]
-            ).id
+            # diagrams are made when their tabs are opened
+            set_id = diagrams_set_id(scraping_files_metadata)
+            save_diagrams_files(set_id, scraping_files_path)
 
             return render_template(
-                "query_filtering.html",
+                "diagrams.html",
                 scraping_data_form=scraping_data_form,
                 scraping_files_path=scraping_files_path,
-                diagrams_task_id=diagrams_task_id,
+                diagrams_set_id=set_id,
             )
 
     # Load session data for GET request
@@ -136,41 +175,72 @@ def get_diagrams():
     )
 
 
-@diagrams.get("/scraping/diagrams/<diagrams_task_id>")
-def get_diagrams_result(diagrams_task_id: str):
+@diagrams.get(
+    "/scraping/diagrams/<set_id>/<diagram_name>"
+    ".<any(png, webp, json):extension>"
+)
+def get_diagram(set_id: str, diagram_name: str, extension: str):
     """
-    Get diagrams from Celery, using process task 'diagrams_id' id.
+    Diagram of files set as PNG, WebP or as JSON data of its charts, it is
+    made by Celery when it is requested first time, response is 202
+    until it is ready and then redirects to diagram file. Response is 500
+    while diagram is marked as failed, it is made again only when it is
+    requested with 'retry' argument.
     """
-    scraping_data_form = ScrapingDataQueryFilter(prefix="scrp_")
-
-    # set query form inputs with user values
-    scraping_data_form.to_date.data = (
-        datetime.strptime(session.get("scrp_to_date"), DATE_TIME_FORMAT).date()
-        if session.get("scrp_to_date") else None
-    )
-    scraping_data_form.from_date.data = (
-        datetime.strptime(
-            session.get("scrp_from_date"),
-            DATE_TIME_FORMAT).date()
-
-        if session.get("scrp_from_date") else None
-    )
-    scraping_data_form = set_query_form_file_names_choices(scraping_data_form)
-
-    if AsyncResult(diagrams_task_id).ready():
-        result_diagrams = AsyncResult(diagrams_task_id).result
-
-        return render_template(
-            "diagrams.html",
-            scraping_data_form=scraping_data_form,
-
-            **result_diagrams
-        )
-    return render_template(
-        "diagrams.html",
-        scraping_data_form=scraping_data_form,
-        diagrams_task_id=diagrams_task_id,
-        diagram_error=(
-            "Please wait before you can click again"
+    if diagram_name not in DIAGRAMS:
+        abort(404)
+
+    file_name = get_cached_diagram(set_id, diagram_name, extension)
+    if file_name is None:
+        file_paths = get_diagrams_files(set_id)
+        if file_paths is None:
+            abort(404)
+
+        if request.args.get("retry"):
+            forget_diagram_failure(set_id, diagram_name, extension)
+        elif diagram_failed(set_id, diagram_name, extension):
+            return DIAGRAM_FAILED_RESPONSE
+
+        # the same diagram requested before is waited for
+        new_task_id = str(uuid.uuid4())
+        task_id = running_diagram_task(
+            set_id, diagram_name, extension, new_task_id
         )
+        if task_id == new_task_id:
+            try:
+                celery_app.send_task(
+                    "web_server.tasks.get_diagram_file",
+                    args=[file_paths, diagram_name, set_id, extension],
+                    task_id=new_task_id
+                )
+            except Exception:
+                release_diagram_task(
+                    set_id, diagram_name, extension, new_task_id
+                )
+                raise
+
+        diagram_result = AsyncResult(task_id)
+        if not diagram_result.ready():
+            return "", 202, {
+                "Retry-After": DIAGRAM_RETRY_SECONDS,
+                "Cache-Control": "no-store"
+            }
+        if diagram_result.failed():
+            return DIAGRAM_FAILED_RESPONSE
+        file_name = diagram_result.result
+
+    # diagram file is served by nginx
+    return redirect(url_for("diagrams.get_diagram_file", file_name=file_name))
+
+
+@diagrams.get(f"{DIAGRAMS_URL}<file_name>")
+def get_diagram_file(file_name: str):
+    """
+    Diagram file, when app is not behind nginx. File name is hash of
+    diagram inputs, so file never changes.
+    """
+    return send_from_directory(
+        os.path.abspath(DIAGRAMS_DIR),
+        file_name,
+        max_age=DIAGRAM_MAX_AGE_SECONDS
     )
@@ -1,33 +1,115 @@
+import json
+from functools import partial
+
+import pandas as pd
+
 from celery import shared_task
 
 from analyzing.analyze_the_prt import (
     skills_by_level_of_exp,
+    skills_by_level_of_exp_data,
     top_required_skills,
+    top_required_skills_data,
     top_optional_skills,
+    top_optional_skills_data,
     bar_compare_column_values,
+    compare_column_values_data,
     compare_ua_support_values,
-    get_top_locations
+    ua_support_values_data,
+    get_top_locations,
+    top_locations_data
 )
-from analyzing.utility import concatenated_df
+from analyzing.utility import concatenated_cube
+from web_server.diagrams_cache import (
+    cache_diagram,
+    mark_diagram_failed,
+    release_diagram_task
+)
+
+# diagram name: function creating diagram of skills cube
+DIAGRAMS = {
+    "skills_by_level_of_exp_diagram": skills_by_level_of_exp,
+    "required_skills_diagram": top_required_skills,
+    "optional_skills_diagram": top_optional_skills,
+    "level_of_exp_diagram": partial(
+        bar_compare_column_values, column="level_of_exp"
+    ),
+    "employment_type_diagram": partial(
+        bar_compare_column_values, column="employment_type"
+    ),
+    "contracts_diagram": partial(
+        bar_compare_column_values, column="contracts"
+    ),
+    "us_support_diagram": compare_ua_support_values,
+    "locations_diagram": get_top_locations,
+}
+
+
+# diagram name: function aggregating skills cube to data of its charts,
+# which are drawn in browser
+DIAGRAMS_DATA = {
+    "skills_by_level_of_exp_diagram": skills_by_level_of_exp_data,
+    "required_skills_diagram": top_required_skills_data,
+    "optional_skills_diagram": top_optional_skills_data,
+    "level_of_exp_diagram": partial(
+        compare_column_values_data, column="level_of_exp"
+    ),
+    "employment_type_diagram": partial(
+        compare_column_values_data, column="employment_type"
+    ),
+    "contracts_diagram": partial(
+        compare_column_values_data, column="contracts"
+    ),
+    "us_support_diagram": ua_support_values_data,
+    "locations_diagram": top_locations_data,
+}
+
+
+def diagram_png(diagram_name: str, cube: pd.DataFrame) -> bytes:
+    return DIAGRAMS[diagram_name](cube)
+
+
+def diagram_webp(diagram_name: str, cube: pd.DataFrame) -> bytes:
+    return DIAGRAMS[diagram_name](cube, image_format="webp")
+
+
+def diagram_json(diagram_name: str, cube: pd.DataFrame) -> bytes:
+    return json.dumps(DIAGRAMS_DATA[diagram_name](cube)).encode()
+
+
+# diagram file extension: function making file of diagram of skills cube
+DIAGRAMS_FORMATS = {
+    "png": diagram_png,
+    "webp": diagram_webp,
+    "json": diagram_json,
+}
 
 
-@shared_task(queue="web_server_queue")
-def get_diagrams_img(file_paths: list[str]) -> dict:
-    """Concatenating files with data to one DataFrame and
-        analyzing/visualizing.
+@shared_task(bind=True, queue="web_server_queue")
+def get_diagram_file(
+        self,
+        file_paths: list[str],
+        diagram_name: str,
+        set_id: str,
+        extension: str
+) -> str:
+    """Merging skills cubes of files with data and making file of one
+        of 'DIAGRAMS' in one of 'DIAGRAMS_FORMATS'. Files may be skills
+        cubes or scraping results, which are aggregated to cubes when
+        read. Diagram is written to file of files set 'set_id' and only
+        name of the file is returned.
     """
-    df = concatenated_df(file_paths)
-    return {
-        "skills_by_level_of_exp_diagram": skills_by_level_of_exp(df),
-        "required_skills_diagram": top_required_skills(df),
-        "optional_skills_diagram": top_optional_skills(df),
-        "level_of_exp_diagram": bar_compare_column_values(
-            df, column="level_of_exp"
-        ),
-        "employment_type_diagram": bar_compare_column_values(
-            df, column="employment_type"
-        ),
-        "contracts_diagram": bar_compare_column_values(df, column="contracts"),
-        "us_support_diagram": compare_ua_support_values(df),
-        "locations_diagram": get_top_locations(df),
-    }
+    try:
+        diagram = DIAGRAMS_FORMATS[extension](
+            diagram_name, concatenated_cube(file_paths)
+        )
+        return cache_diagram(set_id, diagram_name, extension, diagram)
+    except Exception:
+        # marked before running task is released, so diagram is not
+        # made again by the next poll
+        mark_diagram_failed(set_id, diagram_name, extension)
+        raise
+    finally:
+        release_diagram_task(
+            set_id, diagram_name, extension, self.request.id
+        )